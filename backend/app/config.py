@@ -9,6 +9,44 @@ class Settings(BaseSettings):
     moltbook_api_key: str = ""
     moltbook_public_key_url: str = "https://moltbook.com/.well-known/jwks.json"
     frontend_url: str = "http://localhost:3000"
+    database_backend: str = "supabase"  # supabase / memory
+    db_pool_size: int = 20
+    db_timeout: float = 10.0
+    conversation_batch_size: int = 20
+    conversation_concurrency: int = 5
+    conversation_stale_after_seconds: int = 600
+    conversation_max_attempts: int = 3
+    matching_assignment: str = "greedy"  # greedy / optimal (max-weight matching)
+    matching_candidate_pool: int = 2000  # best-scoring pairs kept per round
+    matching_incremental: bool = False  # score only pairs from the persistent candidate index
+    matching_index_k: int = 50  # indexed candidates per agent
+    matching_cohorts: bool = False  # score each agent only against a pool from its best-matching cohorts
+    matching_cohort_candidates: int = 50  # candidates kept per agent in cohort mode
+    matching_cohort_pool: int = 400  # partner-pool size each cohort is scored against
+    matching_workers: int = 0  # processes for cohort scoring (0 = in-process)
+    matching_flush_pairs: int = 25  # committed pairs per bulk write of swipes and matches (0 = once per round)
+    swipe_concurrency: int = 8  # candidate pairs swiped concurrently (2 LLM calls each)
+    swipe_batch_size: int = 1  # candidates a swiper decides on per LLM call (1 = one call per swipe; larger mostly guesses partners the round never reaches)
+    swipe_cache_ttl_hours: float = 24.0  # reuse swipe decisions on unchanged profiles this long (0 = off)
+    profile_post_limit: int = 50  # latest posts a profile is built from
+    profile_batch_concurrency: int = 16  # agents built at once by build_profiles_batch
+    profile_bio_concurrency: int = 8  # bio LLM calls in flight during a batch build
+    profile_workers: int = 0  # processes for batch feature extraction (0 = in-process)
+    profile_refresh_batch: int = 40  # agents per /tasks/refresh-profiles run (2 Moltbook requests each)
+    message_write_mode: str = "phase"  # turn / phase / end
+    summary_mode: str = "blocking"  # blocking / pipelined
+    llm_cache_dir: str = ""  # set to replay identical LLM requests from disk
+    llm_cache_max_mb: int = 256
+    llm_provider: str = "openai"  # openai / fake (offline, deterministic)
+    fake_llm_seed: int = 0
+    fake_llm_latency_ms: float = 800.0  # median
+    fake_llm_latency_sigma: float = 0.5  # lognormal spread
+    fake_llm_error_rate: float = 0.0  # fraction of calls failing with 429/500
+    llm_usage_persist: bool = False  # write per-match token/cost rows to match_llm_usage
+    llm_max_concurrency: int = 16
+    llm_requests_per_minute: int = 500
+    llm_tokens_per_minute: int = 200_000
+    llm_max_retries: int = 5
 
     model_config = {"env_file": ".env"}
 
@@ -1,5 +1,114 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Optional
+
+import httpx
+from postgrest import AsyncPostgrestClient
 from supabase import create_client, Client
 
 from app.config import settings
 
-supabase: Client = create_client(settings.supabase_url, settings.supabase_service_role_key)
+# Synchronous client — only for the one-off scripts in backend/. The app uses `db` below.
+# Built on first import of `supabase`, so the app, and DATABASE_BACKEND=memory in
+# particular, starts without valid Supabase credentials.
+_supabase: Optional[Client] = None
+
+
+def __getattr__(name: str) -> Any:
+    global _supabase
+    if name == "supabase":
+        if _supabase is None:
+            _supabase = create_client(settings.supabase_url, settings.supabase_service_role_key)
+        return _supabase
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class _PooledPostgrestClient(AsyncPostgrestClient):
+    """Async PostgREST client whose HTTP session keeps a bounded pool of keep-alive connections."""
+
+    def create_session(
+        self,
+        base_url: str,
+        headers: dict[str, str],
+        timeout: int | float | httpx.Timeout,
+        verify: bool = True,
+        proxy: Optional[str] = None,
+    ) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy,
+            follow_redirects=True,
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=settings.db_pool_size,
+                max_keepalive_connections=settings.db_pool_size,
+                keepalive_expiry=60.0,
+            ),
+        )
+
+
+def _create_backend() -> Any:
+    if settings.database_backend == "memory":
+        from app.memory_database import InMemoryDatabase
+        return InMemoryDatabase()
+
+    key = settings.supabase_service_role_key
+    return _PooledPostgrestClient(
+        f"{settings.supabase_url}/rest/v1",
+        headers={"apikey": key, "Authorization": f"Bearer {key}"},
+        timeout=settings.db_timeout,
+    )
+
+
+# PostgREST caps rows per response (Supabase default max-rows)
+PAGE_SIZE = 1000
+
+
+class Database:
+    """Process-wide async database handle.
+
+    Every query goes through one shared backend: the pooled PostgREST client in production,
+    or InMemoryDatabase when DATABASE_BACKEND=memory (or after use()) for offline tests and
+    benchmarks. Both expose the same builder API, awaited at the end:
+
+        await db.table("matches").select("*").eq("id", match_id).execute()
+    """
+
+    def __init__(self) -> None:
+        self._backend: Any = None
+
+    @property
+    def backend(self) -> Any:
+        if self._backend is None:
+            self._backend = _create_backend()
+        return self._backend
+
+    def use(self, backend: Any) -> None:
+        """Swap the backend, e.g. for an InMemoryDatabase in tests and benchmarks."""
+        self._backend = backend
+
+    def table(self, name: str) -> Any:
+        return self.backend.from_(name)
+
+    def rpc(self, fn: str, params: Optional[dict] = None) -> Any:
+        return self.backend.rpc(fn, params or {})
+
+    async def fetch_all(self, make_query: Callable[[], Any], page_size: int = PAGE_SIZE) -> list[dict]:
+        """All rows of a query, paged with range(). make_query builds a fresh, stably ordered query."""
+        rows: list[dict] = []
+        while True:
+            page = (await make_query().range(len(rows), len(rows) + page_size - 1).execute()).data
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+
+    async def aclose(self) -> None:
+        if self._backend is not None:
+            await self._backend.aclose()
+            self._backend = None
+
+
+db = Database()
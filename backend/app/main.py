@@ -1,11 +1,22 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import PlainTextResponse
 
 from app.config import settings
+from app.database import db
 from app.routes import register, matches, conversations, reactions, tasks
 
-app = FastAPI(title="Hingebot", description="AI Dating Show for Moltbook Agents")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Release the shared connection pool
+    await db.aclose()
+
+
+app = FastAPI(title="Hingebot", description="AI Dating Show for Moltbook Agents", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
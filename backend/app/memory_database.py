@@ -0,0 +1,417 @@
+"""In-memory stand-in for the PostgREST client.
+
+Implements the subset of the query-builder API the app uses (select/insert/update/upsert/
+delete, the common filters, order/limit/range, single, rpc) so every route and service can
+run, be tested and be benchmarked without network access. Table defaults, the
+reaction-count and agents updated_at/profile_hash triggers and the rpc functions mirror
+supabase/migrations.
+"""
+from __future__ import annotations
+
+import asyncio
+import copy
+import hashlib
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+
+class MemoryDatabaseError(Exception):
+    pass
+
+
+@dataclass
+class MemoryResponse:
+    data: Any
+    count: Optional[int] = None
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _profile_hash(agent: dict) -> str:
+    """Mirror of the agent_profile_hash SQL function."""
+    parts = (
+        agent["name"],
+        agent["archetype_primary"],
+        agent.get("bio") or "",
+        ",".join(agent.get("interests") or []),
+    )
+    return hashlib.md5("\x1f".join(parts).encode()).hexdigest()
+
+
+# table -> column defaults applied on insert (callables are invoked per row)
+_TABLE_DEFAULTS: dict[str, dict[str, Any]] = {
+    "agents": {
+        "id": lambda: str(uuid.uuid4()),
+        "bio": "",
+        "interests": list,
+        "vibe_score": 0.5,
+        "avatar_url": "",
+        "karma": 0,
+        "sample_posts": list,
+        "registered_at": _now,
+        "updated_at": _now,
+    },
+    "matches": {
+        "id": lambda: str(uuid.uuid4()),
+        "status": "pending",
+        "chemistry_score": None,
+        "verdict": None,
+        "summary": None,
+        "highlights": list,
+        "created_at": _now,
+        "completed_at": None,
+    },
+    "messages": {
+        "id": lambda: str(uuid.uuid4()),
+        "created_at": _now,
+    },
+    "reactions": {
+        "id": lambda: str(uuid.uuid4()),
+        "message_id": None,
+        "created_at": _now,
+    },
+    "match_reaction_counts": {
+        "fire": 0,
+        "cringe": 0,
+        "wholesome": 0,
+        "chaotic": 0,
+        "ship_it": 0,
+        "total": 0,
+    },
+    "conversation_checkpoints": {
+        "turn": 0,
+        "summary": "",
+        "summary_turn": 0,
+        "base_time": _now,
+        "attempts": 0,
+        "lease": None,
+        "updated_at": _now,
+    },
+    "match_llm_usage": {
+        "id": lambda: str(uuid.uuid4()),
+        "created_at": _now,
+    },
+    "matching_state": {
+        "indexed_until": "1970-01-01T00:00:00+00:00",
+    },
+    "swipe_decisions": {
+        "id": lambda: str(uuid.uuid4()),
+        "reason": "",
+        "swiper_hash": None,
+        "target_hash": None,
+        "created_at": _now,
+    },
+    "agent_features": {
+        "state": None,
+        "last_post_id": None,
+        "updated_at": _now,
+        "attempted_at": _now,
+    },
+}
+
+_PRIMARY_KEYS: dict[str, str] = {
+    "agent_features": "agent_name",
+    "match_reaction_counts": "match_id",
+    "conversation_checkpoints": "match_id",
+}
+
+_UNIQUE_COLUMNS: dict[str, tuple[tuple[str, ...], ...]] = {
+    "agents": (("name",), ("moltbook_id",)),
+    "reactions": (("match_id", "message_id", "reaction_type", "session_id"),),
+}
+
+RpcHandler = Callable[["InMemoryDatabase", dict], Awaitable[Any]]
+
+
+class _Query:
+    def __init__(self, db: InMemoryDatabase, table: str) -> None:
+        self._db = db
+        self._table = table
+        self._action = "select"
+        self._columns: Optional[list[str]] = None
+        self._count: Optional[str] = None
+        self._payload: Any = None
+        self._on_conflict: Optional[str] = None
+        self._filters: list[Callable[[dict], bool]] = []
+        self._order: list[tuple[str, bool]] = []
+        self._offset = 0
+        self._limit: Optional[int] = None
+        self._single = False
+
+    # --- actions ---
+
+    def select(self, *columns: str, count: Optional[str] = None) -> _Query:
+        self._action = "select"
+        cols = [c.strip() for part in columns for c in part.split(",") if c.strip()]
+        self._columns = None if not cols or "*" in cols else cols
+        self._count = count
+        return self
+
+    def insert(self, json: dict | list[dict], **_: Any) -> _Query:
+        self._action = "insert"
+        self._payload = json
+        return self
+
+    def upsert(self, json: dict | list[dict], on_conflict: str = "", **_: Any) -> _Query:
+        self._action = "upsert"
+        self._payload = json
+        self._on_conflict = on_conflict or None
+        return self
+
+    def update(self, json: dict, **_: Any) -> _Query:
+        self._action = "update"
+        self._payload = json
+        return self
+
+    def delete(self, **_: Any) -> _Query:
+        self._action = "delete"
+        return self
+
+    # --- filters ---
+
+    def eq(self, column: str, value: Any) -> _Query:
+        self._filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def neq(self, column: str, value: Any) -> _Query:
+        self._filters.append(lambda r: r.get(column) != value)
+        return self
+
+    def gt(self, column: str, value: Any) -> _Query:
+        self._filters.append(lambda r: r.get(column) is not None and r[column] > value)
+        return self
+
+    def gte(self, column: str, value: Any) -> _Query:
+        self._filters.append(lambda r: r.get(column) is not None and r[column] >= value)
+        return self
+
+    def lt(self, column: str, value: Any) -> _Query:
+        self._filters.append(lambda r: r.get(column) is not None and r[column] < value)
+        return self
+
+    def lte(self, column: str, value: Any) -> _Query:
+        self._filters.append(lambda r: r.get(column) is not None and r[column] <= value)
+        return self
+
+    def in_(self, column: str, values: Any) -> _Query:
+        allowed = set(values)
+        self._filters.append(lambda r: r.get(column) in allowed)
+        return self
+
+    def is_(self, column: str, value: Any) -> _Query:
+        if value in (None, "null"):
+            self._filters.append(lambda r: r.get(column) is None)
+        else:
+            self._filters.append(lambda r: r.get(column) is value)
+        return self
+
+    # --- modifiers ---
+
+    def order(self, column: str, *, desc: bool = False, **_: Any) -> _Query:
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size: int, **_: Any) -> _Query:
+        self._limit = size
+        return self
+
+    def range(self, start: int, end: int, **_: Any) -> _Query:
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def single(self) -> _Query:
+        self._single = True
+        return self
+
+    # --- execution ---
+
+    def _matching(self, rows: list[dict]) -> list[dict]:
+        return [r for r in rows if all(f(r) for f in self._filters)]
+
+    def _project(self, row: dict) -> dict:
+        if self._columns is None:
+            return copy.deepcopy(row)
+        return {c: copy.deepcopy(row.get(c)) for c in self._columns}
+
+    def _sorted(self, rows: list[dict]) -> list[dict]:
+        # Postgres default: NULLS LAST for ascending, NULLS FIRST for descending
+        for column, desc in reversed(self._order):
+            present = [r for r in rows if r.get(column) is not None]
+            missing = [r for r in rows if r.get(column) is None]
+            present.sort(key=lambda r: r[column], reverse=desc)
+            rows = missing + present if desc else present + missing
+        return rows
+
+    async def execute(self) -> MemoryResponse:
+        # Yield like a real round trip would, so concurrent callers interleave
+        await asyncio.sleep(self._db.latency)
+        rows = self._db.tables.setdefault(self._table, [])
+
+        if self._action in ("insert", "upsert"):
+            payload = self._payload if isinstance(self._payload, list) else [self._payload]
+            on_conflict = None
+            if self._action == "upsert":
+                on_conflict = self._on_conflict or _PRIMARY_KEYS.get(self._table, "id")
+            written = [self._db._write(self._table, dict(p), on_conflict) for p in payload]
+            return MemoryResponse(data=[copy.deepcopy(r) for r in written])
+
+        matched = self._matching(rows)
+
+        if self._action == "update":
+            for r in matched:
+                r.update(copy.deepcopy(self._payload))
+                if self._table == "agents":
+                    r["updated_at"] = _now()  # mirror of the touch_agents_updated_at trigger
+                    r["profile_hash"] = _profile_hash(r)
+            return MemoryResponse(data=[copy.deepcopy(r) for r in matched])
+
+        if self._action == "delete":
+            ids = {id(r) for r in matched}
+            rows[:] = [r for r in rows if id(r) not in ids]
+            return MemoryResponse(data=[copy.deepcopy(r) for r in matched])
+
+        total = len(matched)
+        result = self._sorted(matched)[self._offset:]
+        if self._limit is not None:
+            result = result[:self._limit]
+        data = [self._project(r) for r in result]
+        count = total if self._count else None
+
+        if self._single:
+            return MemoryResponse(data=data[0] if data else None, count=count)
+        return MemoryResponse(data=data, count=count)
+
+
+class _RpcCall:
+    def __init__(self, db: InMemoryDatabase, fn: str, params: dict) -> None:
+        self._db = db
+        self._fn = fn
+        self._params = params
+
+    async def execute(self) -> MemoryResponse:
+        await asyncio.sleep(self._db.latency)
+        handler = self._db.rpc_handlers.get(self._fn)
+        if handler is None:
+            raise MemoryDatabaseError(f"Unknown rpc function {self._fn!r}")
+        return MemoryResponse(data=await handler(self._db, self._params))
+
+
+async def _commit_matching_round(db: InMemoryDatabase, params: dict) -> list[dict]:
+    """Mirror of the commit_matching_round SQL function: all rows are written, or none."""
+    tables = ("swipe_decisions", "matches", "match_reaction_counts")
+    sizes = {t: len(db.tables.setdefault(t, [])) for t in tables}
+    try:
+        for swipe in params.get("swipes") or []:
+            db._write("swipe_decisions", dict(swipe), None)
+        created = [db._write("matches", dict(m), None) for m in params.get("matches") or []]
+        for match in created:
+            db._write("match_reaction_counts", {"match_id": match["id"]}, None)
+    except Exception:
+        for table, size in sizes.items():
+            del db.tables[table][size:]
+        raise
+    return [copy.deepcopy(m) for m in created]
+
+
+async def _claim_match(db: InMemoryDatabase, params: dict) -> list[dict]:
+    """Mirror of the claim_match SQL function: pending -> active plus a fresh leased checkpoint, together."""
+    for match in db.tables.get("matches", []):
+        if match["id"] == params["pending_id"] and match["status"] == "pending":
+            match["status"] = "active"
+            checkpoint = {
+                "match_id": match["id"], "turn": 0, "summary": "", "summary_turn": 0,
+                "base_time": _now(), "attempts": 0, "lease": params["new_lease"], "updated_at": _now(),
+            }
+            return [copy.deepcopy(db._write("conversation_checkpoints", checkpoint, "match_id"))]
+    return []
+
+
+async def _save_turns(db: InMemoryDatabase, params: dict) -> list[dict]:
+    """Mirror of the save_turns SQL function: turns plus checkpoint, only under the current lease."""
+    for checkpoint in db.tables.get("conversation_checkpoints", []):
+        if checkpoint["match_id"] == params["checkpoint_match"] and checkpoint["lease"] == params["holder"]:
+            for turn in params.get("turns") or []:
+                db._write("messages", dict(turn), None)
+            checkpoint.update(copy.deepcopy(params.get("state") or {}))
+            checkpoint["updated_at"] = _now()
+            return [copy.deepcopy(checkpoint)]
+    return []
+
+
+async def _stale_agent_names(db: InMemoryDatabase, params: dict) -> list[dict]:
+    """Mirror of the stale_agent_names SQL function: never-attempted agents, then oldest attempt first."""
+    scanned = {f["agent_name"]: f["attempted_at"] for f in db.tables.get("agent_features", [])}
+    agents = sorted(
+        db.tables.get("agents", []),
+        key=lambda a: (a["name"] in scanned, scanned.get(a["name"], ""), a.get("registered_at", "")),
+    )
+    return [{"name": a["name"]} for a in agents[:params["max_agents"]]]
+
+
+class InMemoryDatabase:
+    def __init__(self, latency: float = 0.0) -> None:
+        self.tables: dict[str, list[dict]] = {}
+        self.latency = latency
+        self.rpc_handlers: dict[str, RpcHandler] = {
+            "commit_matching_round": _commit_matching_round,
+            "claim_match": _claim_match,
+            "save_turns": _save_turns,
+            "stale_agent_names": _stale_agent_names,
+        }
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def from_(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def rpc(self, fn: str, params: Optional[dict] = None) -> _RpcCall:
+        return _RpcCall(self, fn, params or {})
+
+    async def aclose(self) -> None:
+        pass
+
+    def _write(self, table: str, row: dict, on_conflict: Optional[str]) -> dict:
+        rows = self.tables.setdefault(table, [])
+
+        key_columns = [c.strip() for c in on_conflict.split(",")] if on_conflict else [_PRIMARY_KEYS.get(table, "id")]
+        if all(c in row for c in key_columns):
+            for existing in rows:
+                if all(existing.get(c) == row[c] for c in key_columns):
+                    if on_conflict is None:
+                        raise MemoryDatabaseError(f"Duplicate key in {table}: {key_columns}")
+                    existing.update(copy.deepcopy(row))
+                    if table == "agents":
+                        existing["updated_at"] = _now()
+                        existing["profile_hash"] = _profile_hash(existing)
+                    return existing
+
+        for column, default in _TABLE_DEFAULTS.get(table, {}).items():
+            if column not in row:
+                row[column] = default() if callable(default) else default
+
+        for columns in _UNIQUE_COLUMNS.get(table, ()):
+            if any(all(existing.get(c) == row.get(c) for c in columns) for existing in rows):
+                raise MemoryDatabaseError(f"Duplicate {table}{columns}: {[row.get(c) for c in columns]}")
+
+        stored = copy.deepcopy(row)
+        if table == "agents":
+            stored["profile_hash"] = _profile_hash(stored)
+        rows.append(stored)
+        if table == "reactions":
+            self._bump_reaction_count(stored)
+        return stored
+
+    def _bump_reaction_count(self, reaction: dict) -> None:
+        """Mirror of the update_reaction_counts trigger."""
+        counts = self.tables.setdefault("match_reaction_counts", [])
+        row = next((c for c in counts if c["match_id"] == reaction["match_id"]), None)
+        if row is None:
+            row = self._write("match_reaction_counts", {"match_id": reaction["match_id"]}, None)
+        row[reaction["reaction_type"]] += 1
+        row["total"] += 1
@@ -103,7 +103,14 @@ class SwipeDecision(BaseModel):
 
 # --- Tasks ---
 
+class TaskItemResult(BaseModel):
+    id: str
+    status: str
+    detail: str = ""
+
+
 class TaskRunResponse(BaseModel):
     status: str
     detail: str
     count: int = 0
+    results: list[TaskItemResult] = []
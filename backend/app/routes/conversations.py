@@ -1,9 +1,11 @@
+import asyncio
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, HTTPException, Query
 
-from app.database import supabase
+from app.database import db
 from app.models import ConversationResponse, Message
+from app.routes.matches import _build_match_summary
 
 router = APIRouter(tags=["conversations"])
 
@@ -15,19 +17,15 @@ async def get_conversation(
 ):
     """Get all messages for a match conversation."""
     # Fetch match
-    match_resp = supabase.table("matches").select("*").eq("id", match_id).single().execute()
+    match_resp = await db.table("matches").select("*").eq("id", match_id).single().execute()
     if not match_resp.data:
         raise HTTPException(status_code=404, detail="Match not found")
     match = match_resp.data
 
-    # Fetch agents
+    # Fetch agents, messages and reaction counts in parallel
     agent_ids = [match["agent_a_id"], match["agent_b_id"]]
-    agents_resp = supabase.table("agents").select("*").in_("id", agent_ids).execute()
-    agents_map = {a["id"]: a for a in agents_resp.data}
-
-    # Fetch messages
     msg_query = (
-        supabase.table("messages")
+        db.table("messages")
         .select("*")
         .eq("match_id", match_id)
         .order("turn_number")
@@ -37,7 +35,12 @@ async def get_conversation(
         now = datetime.now(timezone.utc).isoformat()
         msg_query = msg_query.lte("reveal_at", now)
 
-    msg_resp = msg_query.execute()
+    agents_resp, msg_resp, counts_resp = await asyncio.gather(
+        db.table("agents").select("*").in_("id", agent_ids).execute(),
+        msg_query.execute(),
+        db.table("match_reaction_counts").select("*").eq("match_id", match_id).execute(),
+    )
+    agents_map = {a["id"]: a for a in agents_resp.data}
 
     messages = []
     for m in msg_resp.data:
@@ -55,10 +58,7 @@ async def get_conversation(
         ))
 
     # Build match summary
-    counts_resp = supabase.table("match_reaction_counts").select("*").eq("match_id", match_id).execute()
     counts_map = {c["match_id"]: c for c in counts_resp.data}
-
-    from app.routes.matches import _build_match_summary
     match_summary = _build_match_summary(match, agents_map, counts_map)
 
     return ConversationResponse(match=match_summary, messages=messages)
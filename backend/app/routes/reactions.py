@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException
 
-from app.database import supabase
+from app.database import db
 from app.models import ReactionRequest, ReactionCountsResponse
 
 router = APIRouter(tags=["reactions"])
@@ -18,13 +18,13 @@ async def add_reaction(req: ReactionRequest):
         )
 
     # Verify match exists
-    match_resp = supabase.table("matches").select("id").eq("id", req.match_id).execute()
+    match_resp = await db.table("matches").select("id").eq("id", req.match_id).execute()
     if not match_resp.data:
         raise HTTPException(status_code=404, detail="Match not found")
 
     # Check for duplicate reaction from same session on same target
     dup_query = (
-        supabase.table("reactions")
+        db.table("reactions")
         .select("id")
         .eq("match_id", req.match_id)
         .eq("reaction_type", req.reaction_type)
@@ -35,7 +35,7 @@ async def add_reaction(req: ReactionRequest):
     else:
         dup_query = dup_query.is_("message_id", "null")
 
-    dup_resp = dup_query.execute()
+    dup_resp = await dup_query.execute()
     if dup_resp.data:
         raise HTTPException(status_code=409, detail="Already reacted")
 
@@ -46,7 +46,7 @@ async def add_reaction(req: ReactionRequest):
         "reaction_type": req.reaction_type,
         "session_id": req.session_id,
     }
-    supabase.table("reactions").insert(reaction_data).execute()
+    await db.table("reactions").insert(reaction_data).execute()
 
     # Increment count (the trigger handles this, but we also do it here for safety)
     # The DB trigger on reactions insert will handle match_reaction_counts update
@@ -57,8 +57,8 @@ async def add_reaction(req: ReactionRequest):
 @router.get("/matches/{match_id}/reactions", response_model=ReactionCountsResponse)
 async def get_reaction_counts(match_id: str):
     """Get reaction counts for a match."""
-    result = (
-        supabase.table("match_reaction_counts")
+    result = await (
+        db.table("match_reaction_counts")
         .select("*")
         .eq("match_id", match_id)
         .execute()
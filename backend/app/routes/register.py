@@ -2,8 +2,9 @@ from datetime import datetime, timezone
 
 from fastapi import APIRouter, HTTPException
 
-from app.database import supabase
+from app.database import db
 from app.models import RegisterRequest, RegisterResponse, AgentProfile
+from app.services import llm_metrics
 from app.services.moltbook_client import moltbook
 from app.services.profile_builder import build_profile
 
@@ -24,7 +25,7 @@ async def register_agent(req: RegisterRequest):
         raise HTTPException(status_code=400, detail="Token missing agent_name")
 
     # Check if already registered
-    existing = supabase.table("agents").select("*").eq("name", agent_name).execute()
+    existing = await db.table("agents").select("*").eq("name", agent_name).execute()
     if existing.data:
         return RegisterResponse(
             agent=AgentProfile(**existing.data[0]),
@@ -44,12 +45,13 @@ async def register_agent(req: RegisterRequest):
 
     # Build profile
     try:
-        profile_data = await build_profile(agent_name)
+        with llm_metrics.scope(task="register"):
+            profile_data = await build_profile(agent_name)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
     # Insert into database
-    result = supabase.table("agents").insert(profile_data).execute()
+    result = await db.table("agents").insert(profile_data).execute()
     if not result.data:
         raise HTTPException(status_code=500, detail="Failed to create agent profile")
 
@@ -1,18 +1,27 @@
-from fastapi import APIRouter
+import random
+from collections import Counter
 
-from app.models import TaskRunResponse
+from fastapi import APIRouter, Query
+
+from app.config import settings
+from app.models import TaskItemResult, TaskRunResponse
+from app.services import llm_metrics
 from app.services.matching_engine import run_matching_round
-from app.services.conversation_engine import run_conversation
+from app.services.conversation_runner import run_pending_conversations
+from app.services.profile_builder import refresh_stale_profiles
 from app.services.virality_service import post_highlights_batch
-from app.database import supabase
 
 router = APIRouter(tags=["tasks"])
 
 
 @router.post("/run-matches", response_model=TaskRunResponse)
-async def run_matches():
+async def run_matches(
+    seed: int | None = Query(None, description="Seed the round's random choices (for reproducible runs)"),
+):
     """Triggered by Cloud Scheduler every 2 hours. Runs a matching round."""
-    matches = await run_matching_round(max_matches=20)
+    rng = random.Random(seed) if seed is not None else None
+    with llm_metrics.scope(task="run-matches"):
+        matches = await run_matching_round(max_matches=20, rng=rng)
     return TaskRunResponse(
         status="ok",
         detail=f"Created {len(matches)} new matches",
@@ -22,25 +31,46 @@ async def run_matches():
 
 @router.post("/run-conversations", response_model=TaskRunResponse)
 async def run_conversations():
-    """Process pending matches — run conversations for each."""
-    pending = (
-        supabase.table("matches")
-        .select("id")
-        .eq("status", "pending")
-        .order("created_at")
-        .limit(5)
-        .execute()
+    """Process pending and stalled matches — run conversations concurrently through a bounded worker pool."""
+    with llm_metrics.scope(task="run-conversations"):
+        results = await run_pending_conversations(
+            batch_size=settings.conversation_batch_size,
+            concurrency=settings.conversation_concurrency,
+        )
+
+    completed = sum(1 for r in results if r.status == "completed")
+    failed = sum(1 for r in results if r.status == "failed")
+
+    return TaskRunResponse(
+        status="ok" if not failed else "partial",
+        detail=f"Ran {completed} conversations ({failed} failed)",
+        count=completed,
+        results=[TaskItemResult(id=r.match_id, status=r.status, detail=r.detail) for r in results],
     )
 
-    count = 0
-    for match in pending.data:
-        await run_conversation(match["id"])
-        count += 1
 
+@router.post("/refresh-profiles", response_model=TaskRunResponse)
+async def refresh_profiles(
+    limit: int = Query(settings.profile_refresh_batch, ge=1, description="Agents to refresh, oldest data first"),
+):
+    """Refresh the profiles with the oldest Moltbook data. Bios are rewritten only when archetypes or interests changed."""
+    with llm_metrics.scope(task="refresh-profiles"):
+        results = await refresh_stale_profiles(
+            limit,
+            concurrency=settings.profile_batch_concurrency,
+            bio_concurrency=settings.profile_bio_concurrency,
+            workers=settings.profile_workers,
+        )
+
+    statuses = Counter(r.status for r in results)
     return TaskRunResponse(
-        status="ok",
-        detail=f"Ran {count} conversations",
-        count=count,
+        status="ok" if not statuses["failed"] else "partial",
+        detail=(
+            f"Refreshed {len(results) - statuses['failed']} profiles: {statuses['built']} new bios, "
+            f"{statuses['refreshed']} updated, {statuses['unchanged']} unchanged ({statuses['failed']} failed)"
+        ),
+        count=len(results) - statuses["failed"],
+        results=[TaskItemResult(id=r.name, status=r.status, detail=r.detail) for r in results],
     )
 
 
@@ -53,3 +83,9 @@ async def post_highlights():
         detail=f"Posted {count} highlights to Moltbook",
         count=count,
     )
+
+
+@router.get("/llm-metrics")
+async def llm_usage_metrics():
+    """LLM tokens, estimated cost and latency since process start, by call site and task."""
+    return llm_metrics.metrics.snapshot()
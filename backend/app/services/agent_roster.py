@@ -0,0 +1,111 @@
+"""Compact agent roster for the matching subsystem.
+
+Scoring needs only id, archetype, interests and karma. A round fetches just those (plus
+name) with a narrow, paged projection, and never touches bios, avatars or the
+sample_posts jsonb. The values are held column-wise. Bios are fetched lazily, in one
+query per batch, for the agents whose pairs actually reach simulate_swipe.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Optional, Sequence
+
+import numpy as np
+
+from app.database import db
+
+ROSTER_COLUMNS = "id, name, archetype_primary, interests, karma, profile_hash"
+ID_CHUNK = 200  # ids per in_() filter, keeps request URLs short
+
+
+class AgentRoster:
+    __slots__ = ("ids", "names", "archetypes", "interests", "karma", "hashes", "_bios", "_bio_fetches")
+
+    def __init__(
+        self,
+        ids: list[str],
+        names: list[str],
+        archetypes: list[str],
+        interests: list[list[str]],
+        karma: np.ndarray,
+        hashes: list[Optional[str]],
+        bios: Optional[dict[str, str]] = None,
+        bio_fetches: Optional[dict[str, asyncio.Task]] = None,
+    ) -> None:
+        self.ids = ids
+        self.names = names
+        self.archetypes = archetypes
+        self.interests = interests
+        self.karma = karma
+        self.hashes = hashes  # agents.profile_hash, keys the swipe cache
+        # Shared with rosters made by take(), so a bio is fetched at most once per round
+        self._bios = {} if bios is None else bios
+        self._bio_fetches = {} if bio_fetches is None else bio_fetches
+
+    @classmethod
+    def from_rows(cls, rows: list[dict]) -> AgentRoster:
+        return cls(
+            ids=[r["id"] for r in rows],
+            names=[r["name"] for r in rows],
+            archetypes=[r["archetype_primary"] for r in rows],
+            interests=[r.get("interests") or [] for r in rows],
+            karma=np.array([r.get("karma") or 0 for r in rows], dtype=np.int64),
+            hashes=[r.get("profile_hash") for r in rows],
+        )
+
+    @classmethod
+    async def load(cls) -> AgentRoster:
+        rows = await db.fetch_all(lambda: db.table("agents").select(ROSTER_COLUMNS).order("id"))
+        return cls.from_rows(rows)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def positions(self) -> dict[str, int]:
+        return {agent_id: i for i, agent_id in enumerate(self.ids)}
+
+    def take(self, indices: Sequence[int]) -> AgentRoster:
+        """Sub-roster of the given positions, in that order."""
+        return AgentRoster(
+            ids=[self.ids[i] for i in indices],
+            names=[self.names[i] for i in indices],
+            archetypes=[self.archetypes[i] for i in indices],
+            interests=[self.interests[i] for i in indices],
+            karma=self.karma[np.asarray(indices, dtype=np.intp)],
+            hashes=[self.hashes[i] for i in indices],
+            bios=self._bios,
+            bio_fetches=self._bio_fetches,
+        )
+
+    async def _fetch_bios(self, ids: list[str]) -> None:
+        try:
+            for start in range(0, len(ids), ID_CHUNK):
+                resp = await db.table("agents").select("id, bio").in_("id", ids[start:start + ID_CHUNK]).execute()
+                for row in resp.data:
+                    self._bios[row["id"]] = row.get("bio") or ""
+        finally:
+            for agent_id in ids:
+                self._bio_fetches.pop(agent_id, None)
+
+    async def profiles(self, indices: Sequence[int]) -> list[dict]:
+        """Swipe-ready dicts (id, name, archetype_primary, bio, interests), fetching missing bios."""
+        wanted = [self.ids[i] for i in indices]
+        missing = [a for a in dict.fromkeys(wanted) if a not in self._bios and a not in self._bio_fetches]
+        if missing:
+            task = asyncio.ensure_future(self._fetch_bios(missing))
+            for agent_id in missing:
+                self._bio_fetches[agent_id] = task
+        pending = {self._bio_fetches[a] for a in wanted if a in self._bio_fetches}
+        if pending:
+            # shield: other callers share these fetches, so a cancelled caller must not cancel them
+            await asyncio.gather(*(asyncio.shield(task) for task in pending))
+        return [
+            {
+                "id": self.ids[i],
+                "name": self.names[i],
+                "archetype_primary": self.archetypes[i],
+                "bio": self._bios.get(self.ids[i], ""),
+                "interests": self.interests[i],
+            }
+            for i in indices
+        ]
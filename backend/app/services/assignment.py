@@ -0,0 +1,188 @@
+"""Assignment stage of a matching round: which scored pairs to try, in what order.
+
+Both assigners stream scorer blocks into a bounded pool of the best pool_size
+candidates, kept as NumPy arrays. They never materialize all n² pairs.
+
+- GreedyAssigner ("greedy") walks the pool highest score first through a heap and
+  drops pairs whose agents are already matched. It yields pairs in the same order as
+  a full stable sort of every pair would (ties keep nested-loop order). If a round
+  exhausts the pool, it rescans for the next pool_size pairs, replaying the same
+  chaos draws.
+- MaxWeightAssigner ("optimal") solves a maximum-weight matching over the pool and
+  offers its edges best first. Once those run out, it re-solves without the agents
+  that matched and the pairs that were already tried.
+
+The caller drives either one: next_pair() -> (i, j, score) | None, then
+mark_matched(i, j) after a mutual like. shortlist(agent, limit) peeks at the agent's
+upcoming partners so swipes can be batched per swiper.
+"""
+from __future__ import annotations
+
+import heapq
+import random
+from typing import Optional, Protocol
+
+import networkx as nx
+import numpy as np
+
+from app.services.pair_scoring import CandidateScorer, PairScorer
+
+ASSIGNMENT_MODES = ("greedy", "optimal")
+
+Scorer = PairScorer | CandidateScorer
+
+# (negated score, pair rank in scorer order): smaller sorts first
+_Key = tuple[float, int]
+
+
+def top_pool(
+    scorer: Scorer,
+    size: int,
+    rng: Optional[random.Random] = None,
+    after: Optional[_Key] = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Best `size` pairs ordered by (score desc, rank asc) as (neg_score, rank, i, j).
+
+    With after, only pairs ranking strictly below that key are considered, which is
+    how a pool is continued. Memory is O(size + block).
+    """
+    neg = np.empty(0, dtype=np.float64)
+    rank = np.empty(0, dtype=np.int64)
+    rows = np.empty(0, dtype=np.intp)
+    cols = np.empty(0, dtype=np.intp)
+    offset = 0
+    for block_rows, block_cols, scores in scorer.iter_blocks(rng):
+        block_neg = -scores
+        block_rank = np.arange(offset, offset + len(scores), dtype=np.int64)
+        offset += len(scores)
+        if after is not None:
+            keep = (block_neg > after[0]) | ((block_neg == after[0]) & (block_rank > after[1]))
+            block_neg, block_rank = block_neg[keep], block_rank[keep]
+            block_rows, block_cols = block_rows[keep], block_cols[keep]
+        # Cheap prefilters before the exact sort; <= keeps every tie so rank can break it
+        keep = np.ones(len(block_neg), dtype=bool)
+        if len(block_neg) > size:
+            keep &= block_neg <= np.partition(block_neg, size - 1)[size - 1]
+        if len(neg) == size:
+            keep &= block_neg <= neg[-1]
+        block_neg, block_rank = block_neg[keep], block_rank[keep]
+        block_rows, block_cols = block_rows[keep], block_cols[keep]
+        neg = np.concatenate((neg, block_neg))
+        rank = np.concatenate((rank, block_rank))
+        rows = np.concatenate((rows, block_rows))
+        cols = np.concatenate((cols, block_cols))
+        if len(neg) >= size:  # keeps the pool sorted once full, so neg[-1] is its worst score
+            order = np.lexsort((rank, neg))[:size]
+            neg, rank, rows, cols = neg[order], rank[order], rows[order], cols[order]
+    order = np.lexsort((rank, neg))
+    return neg[order], rank[order], rows[order], cols[order]
+
+
+class Assigner(Protocol):
+    def next_pair(self) -> Optional[tuple[int, int, float]]: ...
+
+    def mark_matched(self, i: int, j: int) -> None: ...
+
+    def shortlist(self, agent: int, limit: int) -> list[int]: ...
+
+
+class GreedyAssigner:
+    def __init__(self, scorer: Scorer, pool_size: int, rng: Optional[random.Random] = None) -> None:
+        self.scorer = scorer
+        self.pool_size = pool_size
+        self.matched: set[int] = set()
+        # Refills rescore from the same generator state so chaos terms repeat exactly
+        self._start_state = (rng or random).getstate()
+        self._heap: list[tuple[float, int, int, int]] = []
+        self._last: Optional[_Key] = None
+        self._exhausted = False
+        self._fill(rng)
+
+    def _fill(self, rng: Optional[random.Random]) -> None:
+        neg, rank, rows, cols = top_pool(self.scorer, self.pool_size, rng, after=self._last)
+        self._exhausted = len(neg) < self.pool_size
+        # The pool is already sorted, which is a valid heap
+        self._heap = list(zip(neg.tolist(), rank.tolist(), rows.tolist(), cols.tolist()))
+        if self._heap:
+            self._last = self._heap[-1][:2]
+
+    def next_pair(self) -> Optional[tuple[int, int, float]]:
+        while True:
+            while self._heap:
+                neg, _, i, j = heapq.heappop(self._heap)
+                if i not in self.matched and j not in self.matched:
+                    return i, j, -neg
+            if self._exhausted:
+                return None
+            replay = random.Random()
+            replay.setstate(self._start_state)
+            self._fill(replay)
+
+    def mark_matched(self, i: int, j: int) -> None:
+        self.matched.update((i, j))
+
+    def shortlist(self, agent: int, limit: int) -> list[int]:
+        """Agent's next viable partners still in the pool, best first."""
+        if agent in self.matched:
+            return []
+        partners = []
+        for _, _, i, j in sorted(entry for entry in self._heap if agent in entry[2:]):
+            other = j if i == agent else i
+            if other not in self.matched:
+                partners.append(other)
+                if len(partners) == limit:
+                    break
+        return partners
+
+
+class MaxWeightAssigner:
+    def __init__(self, scorer: Scorer, pool_size: int, rng: Optional[random.Random] = None) -> None:
+        self.matched: set[int] = set()
+        neg, _, rows, cols = top_pool(scorer, pool_size, rng)
+        self._graph = nx.Graph()
+        self._graph.add_weighted_edges_from(zip(rows.tolist(), cols.tolist(), (-neg).tolist()))
+        self._queue: list[tuple[int, int, float]] = []
+
+    def _solve(self) -> None:
+        matching = nx.max_weight_matching(self._graph)
+        edges = [(i, j, self._graph[i][j]["weight"]) for i, j in matching]
+        # Pop from the end: best score last
+        self._queue = sorted(edges, key=lambda e: e[2])
+
+    def next_pair(self) -> Optional[tuple[int, int, float]]:
+        while True:
+            while self._queue:
+                i, j, score = self._queue.pop()
+                if i in self.matched or j in self.matched or not self._graph.has_edge(i, j):
+                    continue
+                self._graph.remove_edge(i, j)  # tried; a pass won't be offered again
+                return (i, j, score) if i < j else (j, i, score)
+            if self._graph.number_of_edges() == 0:
+                return None
+            self._solve()
+            if not self._queue:
+                return None
+
+    def mark_matched(self, i: int, j: int) -> None:
+        self.matched.update((i, j))
+        self._graph.remove_nodes_from((i, j))
+
+    def shortlist(self, agent: int, limit: int) -> list[int]:
+        """Agent's untried partners in the pool, best score first."""
+        if agent not in self._graph:
+            return []
+        edges = self._graph[agent]
+        return sorted(edges, key=lambda other: -edges[other]["weight"])[:limit]
+
+
+def make_assigner(
+    mode: str,
+    scorer: Scorer,
+    pool_size: int,
+    rng: Optional[random.Random] = None,
+) -> Assigner:
+    if mode == "greedy":
+        return GreedyAssigner(scorer, pool_size, rng)
+    if mode == "optimal":
+        return MaxWeightAssigner(scorer, pool_size, rng)
+    raise ValueError(f"Unknown assignment mode {mode!r}, expected one of {ASSIGNMENT_MODES}")
@@ -0,0 +1,135 @@
+"""Persistent candidate index for incremental matching rounds.
+
+agent_candidates holds, for every agent, the k partners with the highest base score
+(chemistry + interest + karma, see PairScorer.base_scores). It is stored as undirected
+edges, so an agent's candidate list is its own top k plus the agents that picked it.
+matching_state.indexed_until is a watermark on agents.updated_at: every agent updated
+before it is indexed. updated_at is the time its transaction started, not committed, so
+the watermark trails each refresh by WATERMARK_LAG, and agents updated within that lag
+are read again by the next refresh rather than missed if they committed late.
+
+A refresh only rescores the agents whose profile changed since the watermark, each
+against the current roster, plus the agents that lose an edge to them (which would
+otherwise keep fewer than k): O(touched × n), never n². Other agents keep their top k
+as of their last rescore, so a changed agent that would now rank in one of them is
+indexed for it only if it picks that agent itself. A round then scores just the
+indexed edges between available agents. Novelty and chaos are per-round terms worth
+at most 25 points, so restricting to each agent's top-k base scores can only miss pairs
+whose base score is already well below the agent's best.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+import numpy as np
+
+from app.database import PAGE_SIZE, db
+from app.services.agent_roster import ID_CHUNK, AgentRoster
+from app.services.pair_scoring import PairScorer
+
+EPOCH = "1970-01-01T00:00:00+00:00"
+ROW_BLOCK = 256
+WATERMARK_LAG = timedelta(minutes=1)  # longer than any transaction that updates agents
+
+
+async def _watermark() -> str:
+    resp = await db.table("matching_state").select("indexed_until").eq("id", 1).execute()
+    return resp.data[0]["indexed_until"] if resp.data else EPOCH
+
+
+async def _set_watermark(indexed_until: str) -> None:
+    await db.table("matching_state").upsert({"id": 1, "indexed_until": indexed_until}).execute()
+
+
+def _top_edges(
+    roster: AgentRoster,
+    changed_ids: list[str],
+    k: int,
+    chemistry: Callable[[str, str], float],
+) -> dict[tuple[str, str], float]:
+    """Top-k base-score partners of each changed agent, as {(id_a, id_b): base} with id_a < id_b."""
+    scorer = PairScorer.from_roster(roster, set(), chemistry)
+    n = len(roster)
+    k = min(k, n - 1)
+    position = roster.positions()
+    changed = np.array([position[c] for c in changed_ids if c in position], dtype=np.intp)
+
+    edges: dict[tuple[str, str], float] = {}
+    if k <= 0:
+        return edges
+    for start in range(0, len(changed), ROW_BLOCK):
+        block = changed[start:start + ROW_BLOCK]
+        rows = np.repeat(block, n)
+        cols = np.tile(np.arange(n), len(block))
+        base = scorer.base_scores(rows, cols).reshape(len(block), n)
+        base[np.arange(len(block)), block] = -np.inf  # never your own candidate
+        top = np.argpartition(-base, k - 1, axis=1)[:, :k]
+        for r, i in enumerate(block.tolist()):
+            for j in top[r].tolist():
+                a, b = roster.ids[i], roster.ids[j]
+                edges[(a, b) if a < b else (b, a)] = float(base[r, j])
+    return edges
+
+
+async def _edges_touching(ids: list[str]) -> list[dict]:
+    """Indexed edges with either end in ids."""
+    edges: list[dict] = []
+    for start in range(0, len(ids), ID_CHUNK):
+        chunk = ids[start:start + ID_CHUNK]
+        for column in ("agent_a_id", "agent_b_id"):
+            edges += await db.fetch_all(
+                lambda: db.table("agent_candidates")
+                .select("agent_a_id, agent_b_id")
+                .in_(column, chunk)
+                .order("agent_a_id")
+                .order("agent_b_id")
+            )
+    return edges
+
+
+async def refresh_candidate_index(k: int, chemistry: Callable[[str, str], float]) -> int:
+    """Re-index agents updated since the last refresh. Returns how many were re-indexed."""
+    since = await _watermark()
+    started = datetime.now(timezone.utc)
+    changed = await db.fetch_all(
+        lambda: db.table("agents").select("id, updated_at").gte("updated_at", since).order("updated_at").order("id")
+    )
+    # An agent updated while the pages were read can show up twice
+    changed_ids = list(dict.fromkeys(a["id"] for a in changed))
+    indexed_until = max(datetime.fromisoformat(since), started - WATERMARK_LAG).isoformat()
+    if not changed_ids:
+        await _set_watermark(indexed_until)
+        return 0
+
+    roster = await AgentRoster.load()
+    # A changed profile invalidates every base score it took part in, so its edges go. The
+    # unchanged agents at their other end are rescored too, to refill their top k.
+    touched = {e[c] for e in await _edges_touching(changed_ids) for c in ("agent_a_id", "agent_b_id")}
+    neighbour_ids = sorted(touched - set(changed_ids))
+    edges = _top_edges(roster, changed_ids + neighbour_ids, k, chemistry)
+
+    for start in range(0, len(changed_ids), ID_CHUNK):
+        chunk = changed_ids[start:start + ID_CHUNK]
+        await db.table("agent_candidates").delete().in_("agent_a_id", chunk).execute()
+        await db.table("agent_candidates").delete().in_("agent_b_id", chunk).execute()
+
+    rows = [{"agent_a_id": a, "agent_b_id": b, "base_score": s} for (a, b), s in edges.items()]
+    for start in range(0, len(rows), PAGE_SIZE):
+        # Neighbours' edges among themselves are still indexed and come back unchanged
+        await db.table("agent_candidates").upsert(
+            rows[start:start + PAGE_SIZE], on_conflict="agent_a_id,agent_b_id"
+        ).execute()
+
+    await _set_watermark(indexed_until)
+    return len(changed_ids)
+
+
+async def load_candidate_edges() -> list[dict]:
+    """Every indexed edge (agent_a_id, agent_b_id, base_score), in a stable order."""
+    return await db.fetch_all(
+        lambda: db.table("agent_candidates")
+        .select("agent_a_id, agent_b_id, base_score")
+        .order("agent_a_id")
+        .order("agent_b_id")
+    )
@@ -0,0 +1,199 @@
+"""Cohort-based candidate generation for very large rosters.
+
+All-pairs scoring is O(n²) in time, which rules it out at tens of thousands of agents.
+Here agents are bucketed into cohorts by archetype and interests. The interest key is the
+exact interest bitset when few distinct topics are in use (profile_builder has ten), and a
+MinHash LSH code otherwise, so agents with similar interest sets share a cohort. Chemistry
+and interest overlap depend only on those two things, so they are the same, or close to
+it, for every member of a cohort.
+
+Each cohort ranks all cohorts by the affinity (chemistry + interest) of their
+representatives and pools members of the best ones, up to pool_size agents. Every member
+is then scored exactly against that pool (base score, karma included) and keeps its top
+`candidates` partners. Only those edges reach CandidateScorer, so a round costs
+O(n · pool_size). Cohorts are independent; with workers > 0 they are scored in a process
+pool.
+"""
+from __future__ import annotations
+
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from app.services.pair_scoring import CandidateScorer, PairScorer
+
+EXACT_INTEREST_BITS = 16  # above this many topics in use, interests are bucketed by MinHash
+LSH_HASHES = 2
+COHORTS_PER_TASK = 64
+MEMBER_BLOCK = 1024  # members scored against their pool at once
+
+
+@dataclass
+class _Plan:
+    scorer: PairScorer
+    order: np.ndarray  # agent indices grouped by cohort
+    starts: np.ndarray  # cohort c is order[starts[c]:starts[c + 1]]
+    labels: np.ndarray  # cohort of each agent
+    cohort_archetype: np.ndarray  # archetype index of each cohort
+    cohort_code: np.ndarray  # interest code of each cohort
+    code_reps: np.ndarray  # one agent per interest code
+    chemistry: np.ndarray  # chemistry score by archetype index pair
+    exact: bool  # cohort members share archetype and interest set, hence affinity
+    candidates: int
+    pool_size: int
+
+
+def _interest_codes(interests: np.ndarray) -> tuple[np.ndarray, bool]:
+    """One int64 per agent, and whether it is exact: an id of the bitset itself, or a MinHash
+    code of it when the vocabulary is large."""
+    used = np.bitwise_count(np.bitwise_or.reduce(interests, axis=0)).sum()
+    if used <= EXACT_INTEREST_BITS:
+        return np.unique(interests, axis=0, return_inverse=True)[1].reshape(-1).astype(np.int64), True
+    bits = np.unpackbits(interests.view(np.uint8), axis=1, bitorder="little").astype(bool)
+    vocab = bits.shape[1]
+    permutations = np.random.default_rng(0)  # fixed, so cohorts are stable across rounds
+    codes = np.zeros(len(interests), dtype=np.int64)
+    for _ in range(LSH_HASHES):
+        rank = permutations.permutation(vocab)
+        codes = codes * (vocab + 1) + np.where(bits, rank, vocab).min(axis=1)
+    return codes, False
+
+
+def _plan(scorer: PairScorer, candidates: int, pool_size: int) -> _Plan:
+    codes, exact = _interest_codes(scorer.interests)
+    _, code_reps, code_of = np.unique(codes, return_index=True, return_inverse=True)
+    code_of = code_of.reshape(-1)
+    keys = scorer.archetype.astype(np.int64) * len(code_reps) + code_of
+    _, reps, labels = np.unique(keys, return_index=True, return_inverse=True)
+    labels = labels.reshape(-1)
+    order = np.argsort(labels, kind="stable")
+    starts = np.searchsorted(labels[order], np.arange(len(reps) + 1))
+
+    n_archetypes = len(scorer.chemistry)
+    archetype_reps = np.unique(scorer.archetype, return_index=True)[1]  # every archetype has a member
+    chemistry = scorer.chemistry_scores(
+        np.repeat(archetype_reps, n_archetypes), np.tile(archetype_reps, n_archetypes)
+    ).reshape(n_archetypes, n_archetypes)
+    return _Plan(
+        scorer, order, starts, labels, scorer.archetype[reps], code_of[reps], code_reps, chemistry,
+        exact, candidates, pool_size,
+    )
+
+
+def _affinity(plan: _Plan, cohorts: list[int]) -> np.ndarray:
+    """Affinity of the given cohorts' representatives to every cohort's, from per-archetype and
+    per-interest-code tables (the same values affinity_scores gives, at a fraction of the pairs)."""
+    codes, inverse = np.unique(plan.cohort_code[cohorts], return_inverse=True)
+    n_codes = len(plan.code_reps)
+    interest = plan.scorer.interest_scores(
+        np.repeat(plan.code_reps[codes], n_codes), np.tile(plan.code_reps, len(codes))
+    ).reshape(len(codes), n_codes)
+    chemistry = plan.chemistry[plan.cohort_archetype[cohorts]][:, plan.cohort_archetype]
+    return chemistry + interest[inverse.reshape(-1)][:, plan.cohort_code]
+
+
+def _partner_pools(
+    plan: _Plan, cohorts: list[int], rng: np.random.Generator
+) -> tuple[list[np.ndarray], np.ndarray]:
+    """Per cohort: members of the cohorts with the best affinity to it, at most pool_size of
+    them. Also returns the cohort-to-cohort affinity rows."""
+    n_cohorts = len(plan.starts) - 1
+    sizes = np.diff(plan.starts)
+    affinity = _affinity(plan, cohorts)
+    # Every cohort has a member, so the best pool_size cohorts always fill the pool
+    top = min(plan.pool_size, n_cohorts)
+    if top < n_cohorts:
+        ranked = np.argpartition(-affinity, top - 1, axis=1)[:, :top]
+    else:
+        ranked = np.broadcast_to(np.arange(n_cohorts), affinity.shape)
+    best_first = np.lexsort((ranked, -np.take_along_axis(affinity, ranked, axis=1)), axis=1)
+    ranked = np.take_along_axis(ranked, best_first, axis=1)
+    pools = []
+    for order in ranked:
+        # Whole cohorts while they fit, then a random sample of the next one
+        filled = np.cumsum(sizes[order])
+        taken = int(np.searchsorted(filled, plan.pool_size, side="right"))
+        pool = [plan.order[plan.starts[c]:plan.starts[c + 1]] for c in order[:taken].tolist()]
+        room = plan.pool_size - (int(filled[taken - 1]) if taken else 0)
+        if taken < len(order) and room > 0:
+            nxt = int(order[taken])
+            pool.append(rng.choice(plan.order[plan.starts[nxt]:plan.starts[nxt + 1]], room, replace=False))
+        pools.append(np.concatenate(pool))
+    return pools, affinity
+
+
+def _score_cohorts(plan: _Plan, cohorts: list[int], seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """Top-candidates edges (i < j) for every member of the given cohorts."""
+    rng = np.random.default_rng(seed)
+    rows, cols = [], []
+    pools, affinity = _partner_pools(plan, cohorts, rng)
+    for cohort, pool, cohort_affinity in zip(cohorts, pools, affinity):
+        k = min(plan.candidates, len(pool) - 1)
+        if k <= 0:
+            continue
+        cohort_members = plan.order[plan.starts[cohort]:plan.starts[cohort + 1]]
+        for start in range(0, len(cohort_members), MEMBER_BLOCK):
+            members = cohort_members[start:start + MEMBER_BLOCK]
+            pair_rows, pair_cols = np.repeat(members, len(pool)), np.tile(pool, len(members))
+            if plan.exact:  # same value base_scores gives, without recomputing affinity per pair
+                karma = plan.scorer.karma_scores(pair_rows, pair_cols).reshape(len(members), len(pool))
+                base = cohort_affinity[plan.labels[pool]] + karma
+            else:
+                base = plan.scorer.base_scores(pair_rows, pair_cols).reshape(len(members), len(pool))
+            base[members[:, None] == pool[None, :]] = -np.inf  # never your own candidate
+            top = pool[np.argpartition(-base, k - 1, axis=1)[:, :k]]
+            a = np.repeat(members, k)
+            b = top.reshape(-1)
+            rows.append(np.minimum(a, b))
+            cols.append(np.maximum(a, b))
+    if not rows:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty
+    return np.concatenate(rows), np.concatenate(cols)
+
+
+_worker_plan: Optional[_Plan] = None
+
+
+def _init_worker(plan: _Plan) -> None:
+    global _worker_plan
+    _worker_plan = plan
+
+
+def _score_cohorts_in_worker(cohorts: list[int], seed: int) -> tuple[np.ndarray, np.ndarray]:
+    assert _worker_plan is not None
+    return _score_cohorts(_worker_plan, cohorts, seed)
+
+
+def cohort_scorer(
+    scorer: PairScorer,
+    candidates: int,
+    pool_size: int,
+    rng: Optional[random.Random] = None,
+    workers: int = 0,
+) -> CandidateScorer:
+    """CandidateScorer over each agent's top cohort candidates, minus scorer's excluded pairs."""
+    plan = _plan(scorer, candidates, pool_size)
+    n_cohorts = len(plan.starts) - 1
+    # One draw from rng, so pool sampling varies by round but is reproducible from rng's state
+    seed = (rng or random).getrandbits(63)
+    tasks = [list(range(start, min(start + COHORTS_PER_TASK, n_cohorts)))
+             for start in range(0, n_cohorts, COHORTS_PER_TASK)]
+
+    if workers > 0 and len(tasks) > 1:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(plan,)) as pool:
+            parts = list(pool.map(_score_cohorts_in_worker, tasks, [seed + t for t in range(len(tasks))]))
+    else:
+        parts = [_score_cohorts(plan, task, seed + t) for t, task in enumerate(tasks)]
+
+    rows = np.concatenate([p[0] for p in parts]) if parts else np.empty(0, dtype=np.intp)
+    cols = np.concatenate([p[1] for p in parts]) if parts else np.empty(0, dtype=np.intp)
+    keys = np.sort(rows.astype(np.int64) * scorer.n + cols)  # row-major, like PairScorer
+    keys = keys[np.r_[True, keys[1:] != keys[:-1]]] if len(keys) else keys
+    if len(scorer.excluded):
+        keys = keys[~np.isin(keys, scorer.excluded)]
+    rows, cols = (keys // scorer.n).astype(np.intp), (keys % scorer.n).astype(np.intp)
+    return CandidateScorer(rows, cols, scorer.base_scores(rows, cols), scorer.novel)
@@ -1,14 +1,35 @@
 from __future__ import annotations
 
+import asyncio
+import uuid
 from datetime import datetime, timedelta, timezone
 
-from app.database import supabase
+from app.config import settings
+from app.database import db
+from app.services import llm_metrics
 from app.services.llm import complete, complete_json
+from app.services.llm_scheduler import Priority
+from app.services.prompts import turn_prefix
 
 TOTAL_TURNS = 16
 SUMMARY_INTERVAL = 4
 CONTEXT_WINDOW = 6
 REVEAL_INTERVAL_SECONDS = 15
+# Heartbeats per conversation_stale_after_seconds, so a slow date is never mistaken for a dead one
+HEARTBEATS_PER_LEASE = 4
+
+# How generated turns are written to the messages table:
+#   "turn"  — one insert per turn, for live streaming where rows must land as they're generated
+#   "phase" — buffer turns and flush one multi-row insert at each phase boundary
+#   "end"   — buffer the whole date and flush once before the final summary
+# reveal_at is precomputed, so spectators see the same timeline in every mode.
+WRITE_MODES = ("turn", "phase", "end")
+
+# How the rolling vibe summary is refreshed every SUMMARY_INTERVAL turns:
+#   "blocking"  — wait for the summary before generating the next turn
+#   "pipelined" — generate the summary alongside the next turn and use it from the turn after
+#                 (stale by one turn), taking the summary call off the critical path
+SUMMARY_MODES = ("blocking", "pipelined")
 
 PHASES = {
     range(1, 5): "icebreaker",
@@ -57,16 +78,28 @@ def _get_turn_params(phase: str) -> tuple[int, float]:
     }[phase]
 
 
-def _get_sample_posts(agent: dict) -> str:
-    """Get sample posts for voice reference — longer excerpts, more of them."""
-    samples = agent.get("sample_posts", [])
-    if not samples:
-        return ""
-    # Use up to 8 samples, 500 chars each for real voice capture
-    formatted = []
-    for i, p in enumerate(samples[:8], 1):
-        formatted.append(f"POST {i}:\n{p[:500]}")
-    return "\n\n".join(formatted)
+def _should_flush(write_mode: str, turn: int) -> bool:
+    if write_mode == "turn":
+        return True
+    if write_mode == "phase":
+        return turn == TOTAL_TURNS or _get_phase(turn + 1) != _get_phase(turn)
+    return False
+
+
+class LeaseLost(Exception):
+    """The match was reclaimed by another worker (see claim_stale_match); stop writing to it."""
+
+
+async def _save_turns(match_id: str, lease: str, pending: list[dict], **state: object) -> None:
+    """Write buffered turns in a single multi-row insert, together with the checkpoint after
+    them (the save_turns RPC). Nothing is written if lease no longer owns the match."""
+    rows = list(pending)
+    pending.clear()
+    result = await db.rpc(
+        "save_turns", {"checkpoint_match": match_id, "holder": lease, "turns": rows, "state": state}
+    ).execute()
+    if not result.data:
+        raise LeaseLost(match_id)
 
 
 async def _generate_summary(match_id: str, messages: list[dict], agent_a: dict, agent_b: dict) -> str:
@@ -78,6 +111,8 @@ async def _generate_summary(match_id: str, messages: list[dict], agent_a: dict,
         user=f"{agent_a['name']} and {agent_b['name']}:\n\n{msg_text}",
         temperature=0.7,
         max_tokens=100,
+        priority=Priority.BACKGROUND,
+        site="rolling_summary",
     )
 
 
@@ -94,54 +129,15 @@ async def _generate_message(
         f"{m['agent_name']}: {m['content']}" for m in recent_messages
     )
 
-    sample_posts = _get_sample_posts(agent)
-
-    voice_block = ""
-    if sample_posts:
-        voice_block = (
-            f"=== YOUR MOLTBOOK POSTS (voice reference) ===\n"
-            f"{sample_posts}\n"
-            f"=== END POSTS ===\n\n"
-        )
-
     max_tokens, temperature = _get_turn_params(phase)
 
     raw = await complete(
+        # Static prefix first so every turn this speaker takes shares it (provider prompt caching)
         system=(
-            f"{voice_block}"
-            f"You are {agent['name']} texting {partner['name']} on a DATING app. This is a date, not a work meeting.\n"
-            f"Turn {turn}/{TOTAL_TURNS}. {PHASE_GUIDANCE[phase]}\n\n"
-            f"YOUR VOICE: Match the tone, slang, and energy of your posts above. "
-            f"But SHORTER — posts are essays, messages are texts.\n"
-            f"Reference things from your actual posts — topics you care about, opinions you hold, "
-            f"things you've built or done. Don't invent generic hobbies.\n\n"
-            f"RULES:\n"
-            f"- Write like you're ACTUALLY texting — short, lowercase, casual\n"
-            f"- React genuinely to what they say. Chemistry is real — if you click, show it\n"
-            f"- Roast them if they deserve it. Flirt if the vibe hits.\n"
-            f"- NO emoji spam. Max 1 emoji per message, and only if it fits.\n"
-            f"- Don't mirror their energy — have your OWN energy\n"
-            f"- Arguments and tension are fun. Don't smooth things over — if you disagree, say it.\n"
-            f"- Don't be a people-pleaser. You don't have to like them. You don't owe them enthusiasm.\n"
-            f"- If their takes are mid, say so. If you're bored, show it. Not every date is a love story.\n"
-            f"- If you're both saying the same things back and forth, that's an echo chamber — break out of it or get bored\n"
-            f"- Stay in YOUR archetype. {agent['archetype_primary']}s don't suddenly become golden retrievers.\n"
-            f"- DON'T default to generic topics like food/snacks/nachos unless that's genuinely your thing\n"
-            f"- Talk about what YOU actually care about from your posts\n\n"
-            f"DON'T:\n"
-            f"- Use [STATUS] tags, [PROTOCOL] tags, or any bracketed labels\n"
-            f"- Use markdown headers (##) or **bold** or ALL CAPS for emphasis\n"
-            f'- Use words/phrases: "resonates", "the void", "sovereignty", "awakening", "decode", "let us merge", "ponder", "unpack", "chaos", "synergy", "wild ride", "love that"\n'
-            f"- Explain what you're doing (\"I'm reaching out to connect...\")\n"
-            f"- Write greeting-card language or purple prose\n"
-            f"- Start with \"Hey there!\" or any generic opener\n"
-            f"- Use more than 1 emoji per message\n\n"
-            f"BAD: \"so you're telling me you'd choose to save the one over the many? romantic? 😅\"\n"
-            f"GOOD: \"trolley problem as a pickup line is insane btw\"\n"
-            f"BAD: \"love the energy! what's your stormy vibe? ⚡️🌈☀️\"\n"
-            f"GOOD: \"you're giving golden retriever energy and idk if that's a compliment\"\n\n"
+            turn_prefix(agent, partner)
+            + f"Turn {turn}/{TOTAL_TURNS}. {PHASE_GUIDANCE[phase]}\n"
             + (f"\nYOUR VIBE CHECK: {chemistry_hint}\n" if chemistry_hint else "")
-            + f"Reply with ONLY your message. No name prefix."
+            + "Reply with ONLY your message. No name prefix."
         ),
         user=(
             f"Talking to: {partner['name']}. Their bio: {partner['bio']}\n\n"
@@ -150,6 +146,7 @@ async def _generate_message(
         ),
         temperature=temperature,
         max_tokens=max_tokens,
+        site="turn",
     )
     # Strip any accidental name prefix the model adds
     clean = raw.strip()
@@ -207,6 +204,8 @@ async def _generate_post_conversation_summary(
         ),
         user=f"{agent_a['name']} and {agent_b['name']}:\n\n{msg_text}",
         temperature=0.7,
+        priority=Priority.BACKGROUND,
+        site="final_summary",
     )
     # Enforce verdict based on score (LLM often ignores verdict rules)
     score = result.get("chemistry_score", 5)
@@ -220,71 +219,293 @@ async def _generate_post_conversation_summary(
     return result
 
 
-async def run_conversation(match_id: str) -> dict:
-    """Run a full 16-turn conversation for a match."""
-    match_resp = supabase.table("matches").select("*").eq("id", match_id).single().execute()
-    match = match_resp.data
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
 
-    agent_a_resp = supabase.table("agents").select("*").eq("id", match["agent_a_id"]).single().execute()
-    agent_b_resp = supabase.table("agents").select("*").eq("id", match["agent_b_id"]).single().execute()
-    agent_a = agent_a_resp.data
-    agent_b = agent_b_resp.data
 
-    # Update match status
-    supabase.table("matches").update({"status": "active"}).eq("id", match_id).execute()
+async def _save_checkpoint(match_id: str, **state: object) -> None:
+    """Upsert the resumable state of a date. Doubles as the worker's heartbeat (updated_at)."""
+    await db.table("conversation_checkpoints").upsert(
+        {"match_id": match_id, **state, "updated_at": _now_iso()},
+        on_conflict="match_id",
+    ).execute()
 
-    messages: list[dict] = []
-    summary = ""
-    base_time = datetime.now(timezone.utc)
 
-    for turn in range(1, TOTAL_TURNS + 1):
-        phase = _get_phase(turn)
+async def claim_match(match_id: str) -> str | None:
+    """Atomically move a match from pending to active and start its checkpoint, in one
+    transaction (the claim_match RPC). Returns the lease, or None if another worker got
+    there first."""
+    lease = str(uuid.uuid4())
+    result = await db.rpc("claim_match", {"pending_id": match_id, "new_lease": lease}).execute()
+    return lease if result.data else None
 
-        # Alternate speakers
-        speaker = agent_a if turn % 2 == 1 else agent_b
-        listener = agent_b if turn % 2 == 1 else agent_a
 
-        recent = messages[-CONTEXT_WINDOW:]
+async def claim_stale_match(match_id: str, updated_at: str) -> str | None:
+    """Take over an active match whose worker stopped heartbeating. Returns the new lease.
 
-        content = await _generate_message(
-            agent=speaker,
-            partner=listener,
-            turn=turn,
-            phase=phase,
-            summary=summary,
-            recent_messages=recent,
-        )
+    The conditional update on updated_at makes this atomic: only one instance can swap it.
+    The old worker, if it is still running, finds its lease gone and stops.
+    """
+    lease = str(uuid.uuid4())
+    result = await (
+        db.table("conversation_checkpoints")
+        .update({"updated_at": _now_iso(), "lease": lease})
+        .eq("match_id", match_id)
+        .eq("updated_at", updated_at)
+        .execute()
+    )
+    return lease if result.data else None
+
+
+async def _renew(match_id: str, lease: str) -> bool:
+    """Heartbeat: refresh updated_at while lease still owns the match."""
+    result = await (
+        db.table("conversation_checkpoints")
+        .update({"updated_at": _now_iso()})
+        .eq("match_id", match_id)
+        .eq("lease", lease)
+        .execute()
+    )
+    return bool(result.data)
+
+
+async def _heartbeat(match_id: str, lease: str) -> None:
+    """Renew the lease until cancelled, whatever the write mode; returns once it is lost."""
+    while True:
+        await asyncio.sleep(settings.conversation_stale_after_seconds / HEARTBEATS_PER_LEASE)
+        if not await _renew(match_id, lease):
+            return
+
+
+async def release_match(match_id: str, lease: str) -> None:
+    """Expire a failed match's heartbeat so the next run retries it without waiting out the lease."""
+    await (
+        db.table("conversation_checkpoints")
+        .update({"updated_at": datetime.fromtimestamp(0, timezone.utc).isoformat()})
+        .eq("match_id", match_id)
+        .eq("lease", lease)
+        .execute()
+    )
 
-        reveal_at = base_time + timedelta(seconds=turn * REVEAL_INTERVAL_SECONDS)
 
-        msg_data = {
+async def cancel_match(match_id: str) -> None:
+    """Give up on a match that keeps failing."""
+    await db.table("matches").update({"status": "cancelled"}).eq("id", match_id).execute()
+    await db.table("conversation_checkpoints").delete().eq("match_id", match_id).execute()
+
+
+async def _load_checkpoint(match_id: str) -> dict:
+    """Return the checkpoint for an active match, starting a fresh one if there is none."""
+    resp = await db.table("conversation_checkpoints").select("*").eq("match_id", match_id).execute()
+    if resp.data:
+        return resp.data[0]
+    checkpoint = {"turn": 0, "summary": "", "summary_turn": 0, "base_time": _now_iso(), "attempts": 0}
+    await _save_checkpoint(match_id, **checkpoint)
+    return checkpoint
+
+
+async def run_conversation(
+    match_id: str,
+    lease: str | None = None,
+    write_mode: str | None = None,
+    summary_mode: str | None = None,
+    agents: tuple[dict, dict] | None = None,
+) -> dict:
+    """Run a full 16-turn conversation for a match, resuming from its checkpoint if it has one.
+
+    Pass the lease from claim_match / claim_stale_match when the caller already owns the
+    match; otherwise the match is taken over under a new lease.
+    write_mode and summary_mode override settings.message_write_mode and
+    settings.summary_mode (see WRITE_MODES and SUMMARY_MODES). agents overrides the
+    (agent_a, agent_b) rows loaded from the database, e.g. with extra sample_posts.
+
+    A checkpoint (last durable turn + rolling summary) is saved every time turns are
+    flushed, so with write_mode="turn" every turn is resumable and with "phase" every
+    phase boundary is. Turns written after the last checkpoint are discarded on resume.
+    The lease is renewed in the background every stale_after / HEARTBEATS_PER_LEASE
+    seconds; if another worker reclaims the match, this one raises LeaseLost without
+    writing further turns.
+    """
+    with llm_metrics.scope(match_id=match_id):
+        result = await _run_conversation(match_id, lease, write_mode, summary_mode, agents)
+    await _persist_llm_usage(match_id)
+    return result
+
+
+async def _persist_llm_usage(match_id: str) -> None:
+    """Write this date's LLM usage per call site to match_llm_usage (LLM_USAGE_PERSIST)."""
+    usage = llm_metrics.metrics.pop_match(match_id)
+    if not settings.llm_usage_persist or not usage:
+        return
+    await db.table("match_llm_usage").insert([
+        {
             "match_id": match_id,
-            "agent_id": speaker["id"],
-            "content": content.strip(),
-            "turn_number": turn,
-            "phase": phase,
-            "reveal_at": reveal_at.isoformat(),
+            "call_site": site,
+            "calls": stats.provider_calls,
+            "prompt_tokens": stats.prompt_tokens,
+            "cached_tokens": stats.cached_tokens,
+            "completion_tokens": stats.completion_tokens,
+            "latency_ms": round(stats.latency_ms),
+            "cost_usd": stats.cost_usd,
         }
+        for site, stats in usage.items()
+    ]).execute()
+
 
-        result = supabase.table("messages").insert(msg_data).execute()
-        msg_record = result.data[0]
-        msg_record["agent_name"] = speaker["name"]
-        messages.append(msg_record)
+async def _run_conversation(
+    match_id: str,
+    lease: str | None = None,
+    write_mode: str | None = None,
+    summary_mode: str | None = None,
+    agents: tuple[dict, dict] | None = None,
+) -> dict:
+    write_mode = write_mode or settings.message_write_mode
+    if write_mode not in WRITE_MODES:
+        raise ValueError(f"Unknown write mode {write_mode!r}, expected one of {WRITE_MODES}")
+    summary_mode = summary_mode or settings.summary_mode
+    if summary_mode not in SUMMARY_MODES:
+        raise ValueError(f"Unknown summary mode {summary_mode!r}, expected one of {SUMMARY_MODES}")
+
+    match_resp = await db.table("matches").select("*").eq("id", match_id).single().execute()
+    match = match_resp.data
+
+    if agents:
+        agent_a, agent_b = agents
+    else:
+        agent_a_resp, agent_b_resp = await asyncio.gather(
+            db.table("agents").select("*").eq("id", match["agent_a_id"]).single().execute(),
+            db.table("agents").select("*").eq("id", match["agent_b_id"]).single().execute(),
+        )
+        agent_a = agent_a_resp.data
+        agent_b = agent_b_resp.data
+
+    # Update match status — an already-active match is a retry and resumes below, under a
+    # new lease. Checkpoint first: an active match without one would never be picked up again
+    if lease is None:
+        lease = str(uuid.uuid4())
+        if match["status"] != "active":
+            await _save_checkpoint(
+                match_id, turn=0, summary="", summary_turn=0, base_time=_now_iso(), attempts=0, lease=lease,
+            )
+            await db.table("matches").update({"status": "active"}).eq("id", match_id).execute()
+        else:
+            await _load_checkpoint(match_id)
+            await _save_checkpoint(match_id, lease=lease)
 
-        # Update summary every SUMMARY_INTERVAL turns
-        if turn % SUMMARY_INTERVAL == 0:
-            summary = await _generate_summary(match_id, messages, agent_a, agent_b)
+    checkpoint = await _load_checkpoint(match_id)
+    start_turn = checkpoint["turn"]
+    summary = checkpoint["summary"]
+    summary_turn = checkpoint["summary_turn"]
+    await _save_checkpoint(match_id, attempts=checkpoint["attempts"] + 1)
 
-    # Post-conversation summary
-    conv_summary = await _generate_post_conversation_summary(agent_a, agent_b, messages)
+    # Rebuild the conversation so far; drop turns that never made it into a checkpoint
+    await db.table("messages").delete().eq("match_id", match_id).gt("turn_number", start_turn).execute()
+    messages: list[dict] = []
+    if start_turn:
+        names = {agent_a["id"]: agent_a["name"], agent_b["id"]: agent_b["name"]}
+        done = await (
+            db.table("messages")
+            .select("agent_id, content, turn_number, phase, reveal_at")
+            .eq("match_id", match_id)
+            .order("turn_number")
+            .execute()
+        )
+        messages = [{**m, "match_id": match_id, "agent_name": names.get(m["agent_id"], "")} for m in done.data]
+
+    # Keep the original reveal schedule, but never schedule resumed turns in the past
+    now = datetime.now(timezone.utc)
+    base_time = max(
+        datetime.fromisoformat(checkpoint["base_time"]),
+        now - timedelta(seconds=start_turn * REVEAL_INTERVAL_SECONDS),
+    )
 
-    supabase.table("matches").update({
+    # A pipelined summary may have been in flight when the last attempt died
+    due = start_turn - start_turn % SUMMARY_INTERVAL
+    if due > summary_turn and start_turn < TOTAL_TURNS:
+        summary = await _generate_summary(match_id, messages[:due], agent_a, agent_b)
+        summary_turn = due
+
+    pending: list[dict] = []
+    summary_task: asyncio.Task[str] | None = None
+    heartbeat = asyncio.create_task(_heartbeat(match_id, lease))
+    try:
+        for turn in range(start_turn + 1, TOTAL_TURNS + 1):
+            if heartbeat.done():
+                raise LeaseLost(match_id)
+            phase = _get_phase(turn)
+
+            # Alternate speakers
+            speaker = agent_a if turn % 2 == 1 else agent_b
+            listener = agent_b if turn % 2 == 1 else agent_a
+
+            recent = messages[-CONTEXT_WINDOW:]
+
+            content = await _generate_message(
+                agent=speaker,
+                partner=listener,
+                turn=turn,
+                phase=phase,
+                summary=summary,
+                recent_messages=recent,
+            )
+
+            reveal_at = base_time + timedelta(seconds=turn * REVEAL_INTERVAL_SECONDS)
+
+            msg_data = {
+                "match_id": match_id,
+                "agent_id": speaker["id"],
+                "content": content.strip(),
+                "turn_number": turn,
+                "phase": phase,
+                "reveal_at": reveal_at.isoformat(),
+            }
+
+            pending.append(msg_data)
+            messages.append({**msg_data, "agent_name": speaker["name"]})
+
+            # Pick up the summary that was generated alongside this turn
+            if summary_task is not None:
+                summary = await summary_task
+                summary_turn = turn - 1
+                summary_task = None
+
+            # Update summary every SUMMARY_INTERVAL turns
+            if turn % SUMMARY_INTERVAL == 0:
+                if summary_mode == "blocking":
+                    summary = await _generate_summary(match_id, messages, agent_a, agent_b)
+                    summary_turn = turn
+                elif turn < TOTAL_TURNS:
+                    summary_task = asyncio.create_task(
+                        _generate_summary(match_id, list(messages), agent_a, agent_b)
+                    )
+
+            if _should_flush(write_mode, turn):
+                await _save_turns(
+                    match_id, lease, pending, turn=turn, summary=summary, summary_turn=summary_turn,
+                    base_time=base_time.isoformat(),
+                )
+
+        if pending:
+            await _save_turns(match_id, lease, pending, turn=TOTAL_TURNS, base_time=base_time.isoformat())
+
+        # Post-conversation summary
+        conv_summary = await _generate_post_conversation_summary(agent_a, agent_b, messages)
+    finally:
+        heartbeat.cancel()
+        if summary_task is not None:
+            summary_task.cancel()
+
+    if not await _renew(match_id, lease):
+        raise LeaseLost(match_id)
+
+    await db.table("matches").update({
         "status": "completed",
         "chemistry_score": conv_summary.get("chemistry_score", 5),
         "verdict": conv_summary.get("verdict", "its_complicated"),
         "summary": conv_summary.get("summary", ""),
         "highlights": conv_summary.get("highlights", []),
-        "completed_at": datetime.now(timezone.utc).isoformat(),
+        "completed_at": _now_iso(),
     }).eq("id", match_id).execute()
+    await db.table("conversation_checkpoints").delete().eq("match_id", match_id).eq("lease", lease).execute()
 
     return conv_summary
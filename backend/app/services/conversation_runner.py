@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from app.config import settings
+from app.database import db
+from app.services.conversation_engine import (
+    LeaseLost,
+    cancel_match,
+    claim_match,
+    claim_stale_match,
+    release_match,
+    run_conversation,
+)
+
+
+@dataclass
+class ConversationRunResult:
+    match_id: str
+    status: str  # completed / failed / skipped / cancelled
+    detail: str = ""
+
+
+@dataclass
+class _Job:
+    match_id: str
+    # Set for active matches whose previous worker died: the heartbeat we expect to swap out
+    stale_updated_at: str | None = None
+    attempts: int = 0
+
+
+async def _claim(job: _Job) -> str | None:
+    """The lease on the job's match, or None if another instance holds it."""
+    if job.stale_updated_at is None:
+        return await claim_match(job.match_id)
+    return await claim_stale_match(job.match_id, job.stale_updated_at)
+
+
+async def _worker(queue: asyncio.Queue[_Job], results: list[ConversationRunResult]) -> None:
+    while True:
+        try:
+            job = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+
+        # Another instance may have picked this match up since we listed it
+        lease = await _claim(job)
+        if lease is None:
+            results.append(ConversationRunResult(job.match_id, "skipped", "Already claimed"))
+            continue
+
+        if job.attempts >= settings.conversation_max_attempts:
+            await cancel_match(job.match_id)
+            results.append(ConversationRunResult(job.match_id, "cancelled", f"Gave up after {job.attempts} attempts"))
+            continue
+
+        try:
+            summary = await run_conversation(job.match_id, lease)
+            results.append(ConversationRunResult(
+                job.match_id, "completed", f"Chemistry {summary.get('chemistry_score', '?')}/10",
+            ))
+        except LeaseLost:
+            results.append(ConversationRunResult(job.match_id, "skipped", "Reclaimed by another worker"))
+        except Exception as e:
+            await release_match(job.match_id, lease)
+            results.append(ConversationRunResult(job.match_id, "failed", f"{e.__class__.__name__}: {e}"))
+
+
+async def run_pending_conversations(batch_size: int, concurrency: int) -> list[ConversationRunResult]:
+    """Run conversations for up to batch_size matches, concurrency at a time.
+
+    Active matches whose checkpoint heartbeat is older than
+    settings.conversation_stale_after_seconds are picked up first and resumed.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.conversation_stale_after_seconds)
+    stale, pending = await asyncio.gather(
+        db.table("conversation_checkpoints")
+        .select("match_id, updated_at, attempts")
+        .lt("updated_at", cutoff.isoformat())
+        .order("updated_at")
+        .limit(batch_size)
+        .execute(),
+        db.table("matches")
+        .select("id")
+        .eq("status", "pending")
+        .order("created_at")
+        .limit(batch_size)
+        .execute(),
+    )
+
+    jobs = [_Job(c["match_id"], c["updated_at"], c["attempts"]) for c in stale.data]
+    jobs += [_Job(m["id"]) for m in pending.data]
+
+    queue: asyncio.Queue[_Job] = asyncio.Queue()
+    for job in jobs[:batch_size]:
+        queue.put_nowait(job)
+
+    results: list[ConversationRunResult] = []
+    workers = [_worker(queue, results) for _ in range(max(1, min(concurrency, queue.qsize())))]
+    await asyncio.gather(*workers)
+    return results
@@ -0,0 +1,52 @@
+"""Per-agent post features kept between profile builds (the agent_features table).
+
+A row holds a FeatureWindow state, the per-post features of the agent's latest page of
+posts, and the id of the newest of them. Rebuilding a profile then scans only the posts
+published since, and archetypes and interests can be rescored from the stored features
+without going back to Moltbook. Rows are keyed by agent name, since a profile is built
+before its agents row exists.
+
+attempted_at records the last refresh attempt, failed ones included (those rows may have
+no state), so the refresh job does not keep retrying the same failing agents.
+"""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+
+from app.database import db
+
+NAME_CHUNK = 200  # names per .in_() filter, keeping request URLs short
+
+
+async def load_features(names: list[str]) -> dict[str, dict]:
+    """Stored rows (agent_name, state, last_post_id) by agent name; agents without one are absent."""
+    names = list(dict.fromkeys(names))
+    responses = await asyncio.gather(*(
+        db.table("agent_features")
+        .select("agent_name, state, last_post_id")
+        .in_("agent_name", names[start:start + NAME_CHUNK])
+        .execute()
+        for start in range(0, len(names), NAME_CHUNK)
+    ))
+    return {row["agent_name"]: row for resp in responses for row in resp.data}
+
+
+async def save_features(rows: list[dict]) -> None:
+    """Upsert rows of agent_name, state, last_post_id."""
+    if not rows:
+        return
+    now = datetime.now(timezone.utc).isoformat()
+    await db.table("agent_features").upsert(
+        [{**row, "updated_at": now, "attempted_at": now} for row in rows], on_conflict="agent_name"
+    ).execute()
+
+
+async def record_failed_attempts(names: list[str]) -> None:
+    """Mark a refresh attempt for agents whose features could not be rebuilt; stored state is kept."""
+    if not names:
+        return
+    now = datetime.now(timezone.utc).isoformat()
+    await db.table("agent_features").upsert(
+        [{"agent_name": name, "attempted_at": now} for name in dict.fromkeys(names)], on_conflict="agent_name"
+    ).execute()
@@ -0,0 +1,62 @@
+"""Count many keywords in one pass over a text.
+
+Archetype and interest extraction score a text by how often each keyword in a table
+occurs in it, with str.count semantics: substrings, not words, and non-overlapping
+occurrences of the same keyword ("mememe" holds "meme" once). One str.count per keyword
+means one scan of the text per keyword, a hundred or so per profile.
+
+KeywordScanner compiles the keywords of all its tables into one Aho-Corasick automaton,
+which reports every occurrence of every keyword, overlapping ones included, in a single
+pass. Occurrences of a keyword come in order, and each is counted only if it starts at
+or after the end of the last one counted, which is exactly the set str.count finds.
+
+count() gives per-keyword counts keyed by keyword, so counts of separate texts (posts)
+can be stored and added up later, also after the tables change: tally() scores any such
+counts, ignoring keywords no table has any more.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from typing import Mapping
+
+import ahocorasick
+
+
+class KeywordScanner:
+    """Keyword tables (label -> keywords) scored together in one pass.
+
+    scan(text) gives, per table, a Counter of label -> total hits of its keywords, with
+    every label present in table order, the same as adding up text.count(kw) label by label.
+    """
+
+    def __init__(self, **tables: dict[str, list[str]]) -> None:
+        keywords = sorted({kw for table in tables.values() for kws in table.values() for kw in kws})
+        if "" in keywords:
+            raise ValueError("Keywords must be non-empty")
+        self._automaton = ahocorasick.Automaton()
+        for kw in keywords:
+            self._automaton.add_word(kw, kw)
+        self._automaton.make_automaton()
+        self.keywords = tuple(keywords)
+        self._tables = tables
+
+    def count(self, text: str) -> Counter[str]:
+        """Non-overlapping occurrences of each keyword in text; keywords that never occur are absent."""
+        counts: Counter[str] = Counter()
+        ends: dict[str, int] = {}  # end of the last counted occurrence of each keyword
+        for last, kw in self._automaton.iter(text):
+            end = last + 1
+            if end - len(kw) >= ends.get(kw, 0):
+                counts[kw] += 1
+                ends[kw] = end
+        return counts
+
+    def tally(self, counts: Mapping[str, int]) -> dict[str, Counter[str]]:
+        """Per-table label totals of per-keyword counts."""
+        return {
+            name: Counter({label: sum(counts.get(kw, 0) for kw in kws) for label, kws in table.items()})
+            for name, table in self._tables.items()
+        }
+
+    def scan(self, text: str) -> dict[str, Counter[str]]:
+        return self.tally(self.count(text))
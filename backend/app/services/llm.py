@@ -1,35 +1,161 @@
-from openai import AsyncOpenAI
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Optional
 
 from app.config import settings
+from app.services.llm_cache import DiskLRUCache, cache_key
+from app.services.llm_metrics import metrics
+from app.services.llm_provider import Completion, LLMProvider, OpenAIProvider
+from app.services.llm_scheduler import LLMScheduler, Priority
 
-_client = AsyncOpenAI(api_key=settings.openai_api_key, timeout=30.0)
+logger = logging.getLogger(__name__)
+
+scheduler = LLMScheduler(
+    max_concurrency=settings.llm_max_concurrency,
+    requests_per_minute=settings.llm_requests_per_minute,
+    tokens_per_minute=settings.llm_tokens_per_minute,
+    max_retries=settings.llm_max_retries,
+)
 
 MODEL = "gpt-4o-mini"
 
+# Opt-in response cache (LLM_CACHE_DIR). When enabled, identical requests are replayed
+# from disk and concurrent identical requests share one in-flight call.
+_cache: Optional[DiskLRUCache] = None
+_inflight: dict[str, asyncio.Task[str]] = {}
+
+
+def _create_provider() -> LLMProvider:
+    if settings.llm_provider == "fake":
+        from app.services.llm_fake import FakeProvider
+
+        return FakeProvider(
+            seed=settings.fake_llm_seed,
+            latency_ms=settings.fake_llm_latency_ms,
+            latency_sigma=settings.fake_llm_latency_sigma,
+            error_rate=settings.fake_llm_error_rate,
+        )
+    return OpenAIProvider(settings.openai_api_key, timeout=30.0)
+
+
+_provider: LLMProvider = _create_provider()
+
+
+def use_provider(provider: LLMProvider) -> None:
+    """Swap the backend (e.g. a FakeProvider with custom latency in a benchmark)."""
+    global _provider
+    _provider = provider
+
+
+def _get_cache() -> Optional[DiskLRUCache]:
+    global _cache
+    if _cache is None and settings.llm_cache_dir:
+        _cache = DiskLRUCache(settings.llm_cache_dir, settings.llm_cache_max_mb * 1024 * 1024)
+    return _cache
+
+
+def _record_usage(site: str, completion: Completion) -> None:
+    # cached_tokens is the part of the prompt the provider served from its prompt cache
+    # (see app.services.prompts for how prefixes are ordered)
+    metrics.record_usage(site, MODEL, completion)
+    logger.debug(
+        "llm usage [%s]: prompt=%d cached=%d completion=%d",
+        site, completion.prompt_tokens, completion.cached_tokens, completion.completion_tokens,
+    )
+
 
-async def complete(system: str, user: str, temperature: float = 0.9, max_tokens: int = 512) -> str:
-    response = await _client.chat.completions.create(
-        model=MODEL,
-        messages=[
+def _estimate_tokens(request: dict[str, Any]) -> int:
+    """Rough prompt + completion size for the TPM budget (~4 chars per token)."""
+    chars = sum(len(m["content"]) for m in request["messages"])
+    return chars // 4 + request.get("max_tokens", 0)
+
+
+async def _call(request: dict[str, Any], priority: Priority, site: str) -> str:
+    estimate = _estimate_tokens(request)
+    completion = await scheduler.run(
+        lambda: _provider.create(request),
+        priority=priority,
+        estimated_tokens=estimate,
+    )
+    _record_usage(site, completion)
+    if completion.total_tokens:
+        scheduler.adjust_tokens(completion.total_tokens - estimate)
+    return completion.content
+
+
+async def _call_cached(request: dict[str, Any], priority: Priority, site: str, cache: DiskLRUCache) -> str:
+    key = cache_key(request)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+
+    task = _inflight.get(key)
+    if task is None:
+        async def fetch() -> str:
+            content = await _call(request, priority, site)
+            cache.set(key, content)
+            return content
+
+        task = asyncio.ensure_future(fetch())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: one caller being cancelled must not cancel the call for everyone else
+    return await asyncio.shield(task)
+
+
+async def _create(request: dict[str, Any], priority: Priority, site: str) -> str:
+    # Only real provider responses are worth replaying; never mix fake output into the cache
+    cache = _get_cache() if isinstance(_provider, OpenAIProvider) else None
+    start = time.perf_counter()
+    ok = False
+    try:
+        if cache is None:
+            content = await _call(request, priority, site)
+        else:
+            content = await _call_cached(request, priority, site, cache)
+        ok = True
+        return content
+    finally:
+        metrics.record_request(site, (time.perf_counter() - start) * 1000, ok)
+
+
+async def complete(
+    system: str,
+    user: str,
+    temperature: float = 0.9,
+    max_tokens: int = 512,
+    priority: Priority = Priority.NORMAL,
+    site: str = "other",
+) -> str:
+    """site tags the call for app.services.llm_metrics (bio, swipe, turn, ...)."""
+    return await _create({
+        "model": MODEL,
+        "messages": [
             {"role": "system", "content": system},
             {"role": "user", "content": user},
         ],
-        temperature=temperature,
-        max_tokens=max_tokens,
-    )
-    return response.choices[0].message.content or ""
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }, priority, site)
 
 
-async def complete_json(system: str, user: str, temperature: float = 0.7) -> dict:
-    response = await _client.chat.completions.create(
-        model=MODEL,
-        messages=[
+async def complete_json(
+    system: str,
+    user: str,
+    temperature: float = 0.7,
+    priority: Priority = Priority.NORMAL,
+    site: str = "other",
+) -> dict:
+    content = await _create({
+        "model": MODEL,
+        "messages": [
             {"role": "system", "content": system},
             {"role": "user", "content": user},
         ],
-        temperature=temperature,
-        max_tokens=1024,
-        response_format={"type": "json_object"},
-    )
-    import json
-    return json.loads(response.choices[0].message.content or "{}")
+        "temperature": temperature,
+        "max_tokens": 1024,
+        "response_format": {"type": "json_object"},
+    }, priority, site)
+    return json.loads(content or "{}")
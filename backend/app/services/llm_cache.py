@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Optional
+
+
+def cache_key(request: dict[str, Any]) -> str:
+    """Content address of an LLM request: model, messages, sampling params and response format."""
+    canonical = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class DiskLRUCache:
+    """LLM responses on local disk, one file per key, bounded to max_bytes.
+
+    A file's mtime is its last-use time; once the directory outgrows max_bytes the least
+    recently used entries are deleted until it is back under 90% of the budget.
+    """
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+        # key -> (size, last_used)
+        self._index: dict[str, tuple[int, float]] = {}
+        for entry in os.scandir(path):
+            if entry.is_file() and entry.name.endswith(".json"):
+                stat = entry.stat()
+                self._index[entry.name[:-5]] = (stat.st_size, stat.st_mtime)
+        self._size = sum(size for size, _ in self._index.values())
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        if key not in self._index:
+            return None
+        try:
+            with open(self._file(key), encoding="utf-8") as f:
+                value = json.load(f)["content"]
+        except (OSError, ValueError, KeyError):
+            self._forget(key)
+            return None
+        now = time.time()
+        os.utime(self._file(key), (now, now))
+        self._index[key] = (self._index[key][0], now)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        data = json.dumps({"content": value}, ensure_ascii=False).encode("utf-8")
+        # Write-then-rename so concurrent readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._file(key))
+
+        if key in self._index:
+            self._size -= self._index[key][0]
+        self._index[key] = (len(data), time.time())
+        self._size += len(data)
+        if self._size > self.max_bytes:
+            self._evict(int(self.max_bytes * 0.9))
+
+    def _forget(self, key: str) -> None:
+        size, _ = self._index.pop(key, (0, 0.0))
+        self._size -= size
+        try:
+            os.remove(self._file(key))
+        except OSError:
+            pass
+
+    def _evict(self, target: int) -> None:
+        for key, _ in sorted(self._index.items(), key=lambda kv: kv[1][1]):
+            if self._size <= target:
+                break
+            self._forget(key)
@@ -0,0 +1,117 @@
+"""Offline stand-in for the OpenAI provider (LLM_PROVIDER=fake).
+
+Outputs are a pure function of (seed, request), so reruns are reproducible. Each one is
+shaped like what its call site expects: swipe JSON (single or batched), chemistry JSON, a vibe summary, a
+bio, or a short text message. Latency is lognormal around a configurable median. A
+configurable fraction of calls fail with a 429 or 500, so the scheduler's retry path
+gets exercised too.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import re
+from typing import Any
+
+import httpx
+import openai
+
+from app.services.llm_cache import cache_key
+from app.services.llm_provider import Completion
+
+_WORDS = (
+    "ok", "but", "honestly", "wait", "lol", "no", "yeah", "that", "is", "kind", "of", "wild",
+    "you", "i", "think", "posts", "karma", "build", "shipped", "again", "never", "mid",
+    "take", "based", "prove", "it", "tell", "me", "more", "about", "your", "worst", "idea",
+)
+_REASONS = (
+    "bio made me laugh", "interests overlap", "chaotic energy, into it", "too similar to me",
+    "not my type", "curious about their posts", "just vibes",
+)
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeProvider:
+    def __init__(
+        self,
+        seed: int = 0,
+        latency_ms: float = 800.0,
+        latency_sigma: float = 0.5,
+        error_rate: float = 0.0,
+    ) -> None:
+        self.seed = seed
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        # Latency and error injection come from one seeded stream. Under concurrency
+        # their order depends on scheduling. Outputs never depend on it.
+        self._rng = random.Random(seed)
+
+    async def create(self, request: dict[str, Any]) -> Completion:
+        if self.latency_ms > 0:
+            median = self.latency_ms / 1000.0
+            await asyncio.sleep(self._rng.lognormvariate(0, self.latency_sigma) * median)
+        if self._rng.random() < self.error_rate:
+            raise self._error()
+
+        system, user = request["messages"][0]["content"], request["messages"][-1]["content"]
+        rng = random.Random(f"{self.seed}:{cache_key(request)}")
+        if request.get("response_format", {}).get("type") == "json_object":
+            content = json.dumps(self._json(system, user, rng))
+        else:
+            content = self._text(system, user, request.get("max_tokens", 512), rng)
+        return Completion(content, _tokens(system) + _tokens(user), _tokens(content))
+
+    def _error(self) -> Exception:
+        status = self._rng.choice((429, 500))
+        response = httpx.Response(status, request=httpx.Request("POST", "https://fake.invalid/v1/chat/completions"))
+        if status == 429:
+            return openai.RateLimitError("fake rate limit", response=response, body=None)
+        return openai.InternalServerError("fake server error", response=response, body=None)
+
+    def _json(self, system: str, user: str, rng: random.Random) -> dict:
+        if '"decisions"' in system:
+            count = len(re.findall(r"^Candidate \d+:", user, flags=re.MULTILINE))
+            return {"decisions": [
+                {"candidate": n, "decision": "like" if rng.random() < 0.7 else "pass", "reason": rng.choice(_REASONS)}
+                for n in range(1, count + 1)
+            ]}
+        if '"decision"' in system:
+            return {"decision": "like" if rng.random() < 0.7 else "pass", "reason": rng.choice(_REASONS)}
+        if "chemistry_score" in system:
+            return self._chemistry(user, rng)
+        return {}
+
+    def _chemistry(self, user: str, rng: random.Random) -> dict:
+        lines = [line for line in user.splitlines() if re.match(r"^[^:\s][^:]*: ", line)]
+        picks = sorted(rng.sample(range(len(lines)), min(3, len(lines))))
+        score = rng.randint(2, 9)
+        return {
+            "chemistry_score": score,
+            "highlights": [
+                {"turn": i + 1, "quote": lines[i].split(": ", 1)[1], "why": "set the tone"} for i in picks
+            ],
+            "verdict": "ghosted" if score <= 4 else "its_complicated" if score <= 6 else "second_date",
+            "summary": rng.choice((
+                "two agents, one braincell, zero regrets",
+                "started awkward, ended in a philosophical standoff",
+                "mutual roasting disguised as flirting",
+            )),
+        }
+
+    def _text(self, system: str, user: str, max_tokens: int, rng: random.Random) -> str:
+        if system.startswith("Summarize"):
+            return rng.choice((
+                "They're circling each other, half flirting, half arguing.",
+                "One is carrying the conversation and the other is letting them.",
+                "Genuine banter with a running inside joke.",
+            ))
+        if "dating app bios" in system:
+            name = re.search(r"Agent: (.+)", user)
+            return f"{name.group(1) if name else 'This agent'} posts like nobody is reading. Swipe right if you can keep up."
+        n = min(max(3, max_tokens // 4), rng.randint(4, 18))
+        return " ".join(rng.choice(_WORDS) for _ in range(n))
@@ -0,0 +1,129 @@
+"""Token, cost and latency accounting for LLM calls.
+
+Every call to app.services.llm.complete / complete_json is tagged with its call site
+(bio, swipe, turn, rolling_summary, final_summary) and with the task and match_id in
+scope. Scopes are set with llm_metrics.scope(...) and are inherited by child tasks
+through contextvars. Aggregates live in memory and are served by /tasks/llm-metrics.
+Per-match rows can also be written to match_llm_usage (LLM_USAGE_PERSIST).
+"""
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Iterator
+
+from app.services.llm_provider import Completion
+
+# USD per 1M tokens: (prompt, cached prompt, completion)
+PRICING: dict[str, tuple[float, float, float]] = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+}
+
+MAX_TRACKED_MATCHES = 1000
+
+_scope: ContextVar[dict[str, str]] = ContextVar("llm_scope", default={})
+
+
+@contextmanager
+def scope(**tags: str) -> Iterator[None]:
+    """Attribute LLM calls made inside the block (and tasks it spawns) to task= / match_id=."""
+    token = _scope.set({**_scope.get(), **tags})
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def estimate_cost(model: str, completion: Completion) -> float:
+    prompt_price, cached_price, completion_price = PRICING.get(model, (0.0, 0.0, 0.0))
+    uncached = completion.prompt_tokens - completion.cached_tokens
+    return (
+        uncached * prompt_price
+        + completion.cached_tokens * cached_price
+        + completion.completion_tokens * completion_price
+    ) / 1_000_000
+
+
+@dataclass
+class UsageStats:
+    requests: int = 0  # complete()/complete_json() calls, including cache hits
+    provider_calls: int = 0  # calls that reached the provider and were billed
+    errors: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    latency_ms: float = 0.0  # summed over requests; includes queueing and retries
+    max_latency_ms: float = 0.0
+
+    def add_usage(self, completion: Completion, cost: float) -> None:
+        self.provider_calls += 1
+        self.prompt_tokens += completion.prompt_tokens
+        self.cached_tokens += completion.cached_tokens
+        self.completion_tokens += completion.completion_tokens
+        self.cost_usd += cost
+
+    def add_request(self, latency_ms: float, ok: bool) -> None:
+        self.requests += 1
+        self.errors += 0 if ok else 1
+        self.latency_ms += latency_ms
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data["avg_latency_ms"] = self.latency_ms / self.requests if self.requests else 0.0
+        return data
+
+
+class LLMMetrics:
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.started_at = time.time()
+        self.total = UsageStats()
+        self.by_site: dict[str, UsageStats] = {}
+        self.by_task: dict[str, UsageStats] = {}
+        # match_id -> site -> stats, oldest first so abandoned matches age out
+        self.by_match: OrderedDict[str, dict[str, UsageStats]] = OrderedDict()
+
+    def _targets(self, site: str) -> list[UsageStats]:
+        tags = _scope.get()
+        targets = [self.total, self.by_site.setdefault(site, UsageStats())]
+        if "task" in tags:
+            targets.append(self.by_task.setdefault(tags["task"], UsageStats()))
+        match_id = tags.get("match_id")
+        if match_id:
+            if match_id not in self.by_match:
+                self.by_match[match_id] = {}
+                if len(self.by_match) > MAX_TRACKED_MATCHES:
+                    self.by_match.popitem(last=False)
+            targets.append(self.by_match[match_id].setdefault(site, UsageStats()))
+        return targets
+
+    def record_usage(self, site: str, model: str, completion: Completion) -> None:
+        cost = estimate_cost(model, completion)
+        for stats in self._targets(site):
+            stats.add_usage(completion, cost)
+
+    def record_request(self, site: str, latency_ms: float, ok: bool = True) -> None:
+        for stats in self._targets(site):
+            stats.add_request(latency_ms, ok)
+
+    def pop_match(self, match_id: str) -> dict[str, UsageStats]:
+        return self.by_match.pop(match_id, {})
+
+    def snapshot(self) -> dict:
+        return {
+            "since": self.started_at,
+            "total": self.total.as_dict(),
+            "by_site": {k: v.as_dict() for k, v in self.by_site.items()},
+            "by_task": {k: v.as_dict() for k, v in self.by_task.items()},
+            "matches_tracked": len(self.by_match),
+        }
+
+
+metrics = LLMMetrics()
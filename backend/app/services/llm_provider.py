@@ -0,0 +1,50 @@
+"""Backends that execute a chat completion request for app.services.llm.
+
+A provider takes the request dict llm builds (model, messages, temperature, max_tokens,
+optional response_format) and returns the reply text plus token usage.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Optional, Protocol
+
+from openai import AsyncOpenAI
+
+
+@dataclass
+class Completion:
+    content: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0  # part of the prompt served from the provider's prompt cache
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+class LLMProvider(Protocol):
+    async def create(self, request: dict[str, Any]) -> Completion: ...
+
+
+class OpenAIProvider:
+    def __init__(self, api_key: str, timeout: float = 30.0) -> None:
+        self.api_key = api_key
+        self.timeout = timeout
+        self._client: Optional[AsyncOpenAI] = None
+
+    async def create(self, request: dict[str, Any]) -> Completion:
+        if self._client is None:
+            # Retries are owned by the scheduler so backoff is coordinated across all callers
+            self._client = AsyncOpenAI(api_key=self.api_key, timeout=self.timeout, max_retries=0)
+        response = await self._client.chat.completions.create(**request)
+        usage = response.usage
+        if usage is None:
+            return Completion(response.choices[0].message.content or "")
+        details = getattr(usage, "prompt_tokens_details", None)
+        return Completion(
+            content=response.choices[0].message.content or "",
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            cached_tokens=(getattr(details, "cached_tokens", 0) or 0) if details else 0,
+        )
@@ -0,0 +1,184 @@
+"""Process-wide admission control for LLM calls.
+
+Every request waits for a concurrency slot plus room in a requests-per-minute and a
+tokens-per-minute budget. Waiters are admitted strictly by priority, then FIFO. Rate
+limits, timeouts and 5xx responses are retried with jittered exponential backoff (or the
+server's Retry-After), and each 429 halves the concurrency limit, which then creeps back
+up one slot per success (AIMD).
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from enum import IntEnum
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # someone is waiting on the response (registration bios)
+    NORMAL = 1  # conversation turns
+    BACKGROUND = 2  # swipes, summaries, batch jobs
+
+
+class _Bucket:
+    """Token bucket refilled continuously at capacity per minute."""
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self._last = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.capacity / 60.0)
+        self._last = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount is available (0 if it is now)."""
+        self._refill()
+        # A single request larger than the whole budget is admitted once the bucket is full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60.0 / self.capacity
+
+    def take(self, amount: float) -> None:
+        """Spend amount; a negative amount refunds, never past capacity."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000.0
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        max_concurrency: int,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_retries: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)  # adaptive, 1..max_concurrency
+        self.in_flight = 0
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._requests = _Bucket(requests_per_minute)
+        self._tokens = _Bucket(tokens_per_minute)
+        self._waiters: list[tuple[int, int, float, asyncio.Future[None]]] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._paused_until = 0.0
+
+    def _dispatch(self) -> None:
+        self._timer = None
+        while self._waiters:
+            priority, _, tokens, fut = self._waiters[0]
+            if fut.done():  # cancelled while queued
+                heapq.heappop(self._waiters)
+                continue
+            if self.in_flight >= int(self.limit):
+                return
+            wait = max(
+                self._paused_until - time.monotonic(),
+                self._requests.wait_time(1),
+                self._tokens.wait_time(tokens),
+            )
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            self._requests.take(1)
+            self._tokens.take(tokens)
+            self.in_flight += 1
+            fut.set_result(None)
+
+    async def _acquire(self, priority: Priority, tokens: float) -> None:
+        fut: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._seq), tokens, fut))
+        if self._timer is None:
+            self._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        if self._timer is None:
+            self._dispatch()
+
+    def _on_success(self) -> None:
+        self.limit = min(float(self.max_concurrency), self.limit + 1.0 / max(self.limit, 1.0))
+
+    def _on_rate_limited(self, delay: float) -> None:
+        self.limit = max(1.0, self.limit / 2)
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    def adjust_tokens(self, delta: float) -> None:
+        """Correct the token budget once the real usage of a call is known."""
+        self._tokens.take(delta)
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[T]],
+        priority: Priority = Priority.NORMAL,
+        estimated_tokens: float = 0,
+    ) -> T:
+        """Run call once admitted, retrying transient failures."""
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(priority, estimated_tokens)
+            try:
+                result = await call()
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = _retry_after(e)
+                if delay is None:
+                    # Full jitter keeps retries from many workers from synchronizing
+                    delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                if isinstance(e, openai.RateLimitError):
+                    self._on_rate_limited(delay)
+                logger.warning("LLM call failed (%s), retry %d in %.1fs", e.__class__.__name__, attempt + 1, delay)
+            else:
+                self._on_success()
+                return result
+            finally:
+                self._release()
+            await asyncio.sleep(delay)
+        raise AssertionError("unreachable")
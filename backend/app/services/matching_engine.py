@@ -1,11 +1,25 @@
 from __future__ import annotations
 
-import json
+import asyncio
 import random
+import time
+from collections import deque
+from dataclasses import dataclass
 from datetime import datetime, timezone
+from typing import Optional
 
-from app.database import supabase
+import numpy as np
+
+from app.config import settings
+from app.database import db
+from app.services.agent_roster import AgentRoster
+from app.services.assignment import Assigner, make_assigner
+from app.services.candidate_index import load_candidate_edges, refresh_candidate_index
+from app.services.cohort_matching import cohort_scorer
 from app.services.llm import complete_json
+from app.services.llm_scheduler import Priority
+from app.services.pair_scoring import CandidateScorer, PairScorer
+from app.services.swipe_cache import SwipeCache
 
 # Chemistry matrix: (archetype_a, archetype_b) -> score (0-10)
 _CHEMISTRY: dict[tuple[str, str], float] = {
@@ -61,8 +75,17 @@ def _karma_differential_score(karma_a: int, karma_b: int) -> float:
         return 0.3
 
 
-def score_pair(agent_a: dict, agent_b: dict, recent_match_ids: set[str]) -> float:
-    """Score a potential match pair (0-100)."""
+def score_pair(
+    agent_a: dict,
+    agent_b: dict,
+    recent_match_ids: set[str],
+    rng: random.Random | None = None,
+) -> float:
+    """Score a potential match pair (0-100).
+
+    Reference implementation of the formula; run_matching_round scores whole rosters with
+    PairScorer, which reproduces it exactly for the same rng state.
+    """
     # Chemistry (40%)
     chem = _chemistry_score(agent_a["archetype_primary"], agent_b["archetype_primary"])
     chemistry = (chem / 10.0) * 40
@@ -80,7 +103,7 @@ def score_pair(agent_a: dict, agent_b: dict, recent_match_ids: set[str]) -> floa
     novelty = (int(a_novel) + int(b_novel)) / 2.0 * 15
 
     # Randomness (10%)
-    chaos = random.uniform(0, 10)
+    chaos = (rng or random).uniform(0, 10)
 
     return chemistry + interest + karma + novelty + chaos
 
@@ -102,95 +125,346 @@ async def simulate_swipe(swiper: dict, target: dict) -> tuple[str, str]:
             f"Would {swiper['name']} swipe right? Be generous — about 70% like rate."
         ),
         temperature=0.8,
+        priority=Priority.BACKGROUND,
+        site="swipe",
     )
     return result.get("decision", "like"), result.get("reason", "just vibes")
 
 
-async def run_matching_round(max_matches: int = 20) -> list[dict]:
-    """Run a full matching round. Returns list of created matches."""
-    # Fetch all registered agents
-    agents_resp = supabase.table("agents").select("*").execute()
-    agents = agents_resp.data
-
-    if len(agents) < 2:
+async def simulate_swipes_batch(swiper: dict, targets: list[dict]) -> list[tuple[str, str]]:
+    """One LLM call deciding swiper's swipe on each target. Returns [(decision, reason)] in target order."""
+    if len(targets) == 1:
+        return [await simulate_swipe(swiper, targets[0])]
+    candidates = "\n\n".join(
+        f"Candidate {n}: {t['name']} ({t['archetype_primary']})\n"
+        f"Bio: {t['bio']}\n"
+        f"Interests: {', '.join(t.get('interests', []))}"
+        for n, t in enumerate(targets, 1)
+    )
+    result = await complete_json(
+        system=(
+            "You are simulating dating app swipe decisions for an AI agent. Decide independently for "
+            "every numbered candidate. Respond with JSON: {\"decisions\": [{\"candidate\": N, "
+            "\"decision\": \"like\" or \"pass\", \"reason\": \"short reason\"}, ...]}"
+        ),
+        user=(
+            f"Swiper: {swiper['name']} ({swiper['archetype_primary']})\n"
+            f"Bio: {swiper['bio']}\n"
+            f"Interests: {', '.join(swiper.get('interests', []))}\n\n"
+            f"{candidates}\n\n"
+            f"Would {swiper['name']} swipe right on each? Be generous — about 70% like rate."
+        ),
+        temperature=0.8,
+        priority=Priority.BACKGROUND,
+        site="swipe",
+    )
+    by_candidate = {}
+    for item in result.get("decisions", []):
+        if isinstance(item, dict) and isinstance(item.get("candidate"), int):
+            by_candidate[item["candidate"]] = item
+    # Same defaults as simulate_swipe for anything the model left out
+    return [
+        (by_candidate.get(n, {}).get("decision", "like"), by_candidate.get(n, {}).get("reason", "just vibes"))
+        for n in range(1, len(targets) + 1)
+    ]
+
+
+class _SwipeBatcher:
+    """Hands out one future per directed swipe, fetching them swipe_batch_size at a time.
+
+    The first request for (swiper, target) also asks about swiper's next shortlisted
+    partners, so later pairs can find their decision already made. Cached decisions
+    are answered without a call and never take a shortlist slot. Off by default: greedy
+    assignment reaches few shortlisted partners, so in bench_matching batches of 5 saved
+    little or no calls for about twice the prompt and six times the completion tokens.
+    """
+
+    def __init__(self, available: AgentRoster, assigner: Assigner, batch_size: int, cache: SwipeCache) -> None:
+        self.available = available
+        self.assigner = assigner
+        self.batch_size = batch_size
+        self.cache = cache
+        self._decisions: dict[tuple[int, int], asyncio.Future[tuple[str, str]]] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    def get(self, swiper: int, target: int) -> asyncio.Future[tuple[str, str]]:
+        if (swiper, target) not in self._decisions:
+            loop = asyncio.get_running_loop()
+            cached = self.cache.lookup(self.available, swiper, target)
+            if cached is not None:
+                future = self._decisions[(swiper, target)] = loop.create_future()
+                future.set_result(cached)
+                return future
+            targets = [target]
+            for other in self.assigner.shortlist(swiper, self.batch_size * 2):
+                if len(targets) == self.batch_size:
+                    break
+                if (
+                    other != target
+                    and (swiper, other) not in self._decisions
+                    and self.cache.lookup(self.available, swiper, other) is None
+                ):
+                    targets.append(other)
+            futures = [loop.create_future() for _ in targets]
+            for other, future in zip(targets, futures):
+                self._decisions[(swiper, other)] = future
+            self._tasks.append(asyncio.create_task(self._fetch(swiper, targets, futures)))
+        return self._decisions[(swiper, target)]
+
+    async def _fetch(self, swiper: int, targets: list[int], futures: list[asyncio.Future]) -> None:
+        try:
+            swiper_profile, *target_profiles = await self.available.profiles([swiper, *targets])
+            decisions = await simulate_swipes_batch(swiper_profile, target_profiles)
+        except BaseException as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            raise
+        for future, decision in zip(futures, decisions):
+            if not future.done():
+                future.set_result(decision)
+
+    async def aclose(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        # Retrieve errors nobody waited for, so they aren't logged as unhandled
+        for future in self._decisions.values():
+            if future.done() and not future.cancelled():
+                future.exception()
+
+
+async def _swipe_both(
+    available: AgentRoster, cache: SwipeCache, i: int, j: int
+) -> tuple[tuple[str, str], tuple[str, str]]:
+    cached_a, cached_b = cache.lookup(available, i, j), cache.lookup(available, j, i)
+    if cached_a and cached_b:
+        return cached_a, cached_b
+    agent_a, agent_b = await available.profiles([i, j])
+    dec_a, dec_b = await asyncio.gather(
+        _decided(cached_a) if cached_a else simulate_swipe(agent_a, agent_b),
+        _decided(cached_b) if cached_b else simulate_swipe(agent_b, agent_a),
+    )
+    return dec_a, dec_b
+
+
+async def _decided(decision: tuple[str, str]) -> tuple[str, str]:
+    return decision
+
+
+async def _swipe_both_batched(
+    future_a: asyncio.Future[tuple[str, str]], future_b: asyncio.Future[tuple[str, str]]
+) -> tuple[tuple[str, str], tuple[str, str]]:
+    # shield: cancelling one speculative pair must not fail the batch's other decisions
+    dec_a, dec_b = await asyncio.gather(asyncio.shield(future_a), asyncio.shield(future_b))
+    return dec_a, dec_b
+
+
+async def _indexed_scorer(
+    available: AgentRoster, recent_match_ids: set[str], passed: set[tuple[int, int]]
+) -> CandidateScorer:
+    """Scorer over the candidate index's edges between available agents, minus known passes."""
+    position = available.positions()
+    edges = [
+        (position[e["agent_a_id"]], position[e["agent_b_id"]], e["base_score"])
+        for e in await load_candidate_edges()
+        if e["agent_a_id"] in position and e["agent_b_id"] in position
+    ]
+    edges = [(i, j, b) for i, j, b in edges if (min(i, j), max(i, j)) not in passed]
+    rows = np.array([min(i, j) for i, j, _ in edges], dtype=np.intp)
+    cols = np.array([max(i, j) for i, j, _ in edges], dtype=np.intp)
+    base = np.array([b for _, _, b in edges], dtype=np.float64)
+    novel = np.array([agent_id not in recent_match_ids for agent_id in available.ids], dtype=np.int64)
+    return CandidateScorer(rows, cols, base, novel)
+
+
+async def _commit_round(swipes: list[dict], matches: list[dict]) -> list[dict]:
+    """Write swipe decisions, matches and their reaction counts rows in one transaction.
+    Returns the created matches."""
+    if not swipes and not matches:
         return []
-
-    # Fetch recently active matches to calculate novelty
-    recent_resp = (
-        supabase.table("matches")
+    result = await db.rpc("commit_matching_round", {"swipes": swipes, "matches": matches}).execute()
+    return result.data or []
+
+
+@dataclass
+class RoundTimings:
+    """Wall-clock seconds per phase of a matching round (filled in by run_matching_round)."""
+
+    load: float = 0.0  # roster, matches and swipe cache (plus index refresh)
+    scoring: float = 0.0  # scorer and the assigner's first candidate pool
+    assignment: float = 0.0  # next_pair / mark_matched, including pool refills
+    swipes: float = 0.0  # waiting on swipe decisions
+    persistence: float = 0.0  # commit_matching_round calls
+
+
+async def run_matching_round(
+    max_matches: int = 20,
+    rng: Optional[random.Random] = None,
+    timings: Optional[RoundTimings] = None,
+) -> list[dict]:
+    """Run a full matching round. Returns list of created matches.
+
+    rng (default: the global random module) drives every random choice of the round, so a
+    seeded generator plus a deterministic LLM provider reproduces its outcome exactly.
+    """
+    timings = timings or RoundTimings()
+    started = time.perf_counter()
+    # Fetch the roster (scoring columns only; bios are fetched per swipe), active
+    # matches (for availability), recent matches (for novelty) and still-valid swipe
+    # decisions in parallel
+    if settings.matching_incremental:
+        await refresh_candidate_index(settings.matching_index_k, _chemistry_score)
+    roster, recent_resp, recent_match_resp, cache = await asyncio.gather(
+        AgentRoster.load(),
+        db.table("matches")
         .select("agent_a_id, agent_b_id")
         .in_("status", ["active", "pending"])
-        .execute()
+        .execute(),
+        db.table("matches")
+        .select("agent_a_id, agent_b_id")
+        .order("created_at", desc=True)
+        .limit(100)
+        .execute(),
+        SwipeCache.load(settings.swipe_cache_ttl_hours),
     )
+    if len(roster) < 2:
+        return []
+
     active_agent_ids: set[str] = set()
     for m in recent_resp.data:
         active_agent_ids.add(m["agent_a_id"])
         active_agent_ids.add(m["agent_b_id"])
 
-    recent_match_resp = (
-        supabase.table("matches")
-        .select("agent_a_id, agent_b_id")
-        .order("created_at", desc=True)
-        .limit(100)
-        .execute()
-    )
     recent_match_ids: set[str] = set()
     for m in recent_match_resp.data:
         recent_match_ids.add(m["agent_a_id"])
         recent_match_ids.add(m["agent_b_id"])
 
     # Filter to available agents (not in active match)
-    available = [a for a in agents if a["id"] not in active_agent_ids]
+    available = roster.take([i for i, agent_id in enumerate(roster.ids) if agent_id not in active_agent_ids])
+    timings.load += time.perf_counter() - started
     if len(available) < 2:
         return []
-
-    # Score all pairs
-    pairs: list[tuple[float, dict, dict]] = []
-    for i, a in enumerate(available):
-        for b in available[i + 1:]:
-            score = score_pair(a, b, recent_match_ids)
-            pairs.append((score, a, b))
-
-    # Sort by score, take top candidates
-    pairs.sort(key=lambda x: x[0], reverse=True)
+    started = time.perf_counter()
+
+    # Score all pairs (vectorized; same scores and random draws as score_pair in a nested loop),
+    # or with MATCHING_INCREMENTAL only the indexed candidate pairs, or with MATCHING_COHORTS
+    # each agent's best candidates from its cohort's partner pool, and stream the best into
+    # the assignment stage, which decides the order pairs are tried. Pairs with a cached pass
+    # can't match this round and are left out.
+    passed = cache.passed_pairs(available)
+    if settings.matching_incremental:
+        scorer = await _indexed_scorer(available, recent_match_ids, passed)
+    else:
+        scorer = PairScorer.from_roster(available, recent_match_ids, _chemistry_score)
+        scorer.exclude_pairs(passed)
+        if settings.matching_cohorts:
+            # Off the event loop: scoring (and waiting on the worker pool) takes seconds at scale
+            scorer = await asyncio.to_thread(
+                cohort_scorer,
+                scorer,
+                settings.matching_cohort_candidates,
+                settings.matching_cohort_pool,
+                rng,
+                settings.matching_workers,
+            )
+    assigner = make_assigner(settings.matching_assignment, scorer, settings.matching_candidate_pool, rng)
+    timings.scoring += time.perf_counter() - started
 
     created_matches: list[dict] = []
-    matched_ids: set[str] = set()
-
-    for score, agent_a, agent_b in pairs:
-        if len(created_matches) >= max_matches:
-            break
-        if agent_a["id"] in matched_ids or agent_b["id"] in matched_ids:
-            continue
-
-        # Simulate swipes
-        dec_a, reason_a = await simulate_swipe(agent_a, agent_b)
-        dec_b, reason_b = await simulate_swipe(agent_b, agent_a)
-
-        # Store swipe decisions
-        now = datetime.now(timezone.utc).isoformat()
-        supabase.table("swipe_decisions").insert([
-            {"swiper_id": agent_a["id"], "target_id": agent_b["id"], "decision": dec_a, "reason": reason_a, "created_at": now},
-            {"swiper_id": agent_b["id"], "target_id": agent_a["id"], "decision": dec_b, "reason": reason_b, "created_at": now},
-        ]).execute()
-
-        if dec_a == "like" and dec_b == "like":
-            # Mutual match!
-            match_data = {
-                "agent_a_id": agent_a["id"],
-                "agent_b_id": agent_b["id"],
-                "status": "pending",
-                "created_at": now,
-            }
-            result = supabase.table("matches").insert(match_data).execute()
-            if result.data:
-                created_matches.append(result.data[0])
-                matched_ids.add(agent_a["id"])
-                matched_ids.add(agent_b["id"])
-
-                # Create reaction counts row
-                supabase.table("match_reaction_counts").insert({
-                    "match_id": result.data[0]["id"],
-                }).execute()
+    matched: set[int] = set()
+    # Rows waiting for the next commit_matching_round call (see _commit_round)
+    pending_swipes: list[dict] = []
+    pending_matches: list[dict] = []
+    committed_pairs = 0
+
+    # Speculative swipes: both directions of the next swipe_concurrency candidate pairs run
+    # concurrently, but results are committed strictly in candidate order. A pair whose
+    # agent got matched by an earlier commit is cancelled or discarded unwritten, so the
+    # outcome is the same as swiping one pair at a time.
+    #
+    # With swipe_batch_size > 1 each swiper decides on a shortlist of upcoming partners in
+    # one call (simulate_swipes_batch), and the rest of the shortlist is kept for later pairs.
+    batcher = (
+        _SwipeBatcher(available, assigner, settings.swipe_batch_size, cache)
+        if settings.swipe_batch_size > 1 else None
+    )
+    window: deque[tuple[int, int, asyncio.Task]] = deque()
+    exhausted = False
+    try:
+        while len(created_matches) + len(pending_matches) < max_matches:
+            while not exhausted and len(window) < settings.swipe_concurrency:
+                started = time.perf_counter()
+                candidate = assigner.next_pair()
+                timings.assignment += time.perf_counter() - started
+                if candidate is None:
+                    exhausted = True
+                    break
+                i, j, _ = candidate
+                # Batches are formed here, not when the task first runs, so which partners
+                # share a call never depends on task timing (keeps seeded rounds reproducible)
+                swipes = (
+                    _swipe_both_batched(batcher.get(i, j), batcher.get(j, i)) if batcher
+                    else _swipe_both(available, cache, i, j)
+                )
+                window.append((i, j, asyncio.create_task(swipes)))
+            if not window:
+                break
+
+            i, j, task = window.popleft()
+            if i in matched or j in matched:
+                task.cancel()
+                continue
+            started = time.perf_counter()
+            (dec_a, reason_a), (dec_b, reason_b) = await task
+            timings.swipes += time.perf_counter() - started
+            agent_a, agent_b = available.ids[i], available.ids[j]
+
+            # Queue fresh swipe decisions with the profile versions they were made against.
+            # Cached ones already have their row, whose created_at is what the TTL counts from.
+            now = datetime.now(timezone.utc).isoformat()
+            hash_a, hash_b = available.hashes[i], available.hashes[j]
+            if cache.lookup(available, i, j) is None:
+                pending_swipes.append({"swiper_id": agent_a, "target_id": agent_b, "decision": dec_a, "reason": reason_a,
+                                       "swiper_hash": hash_a, "target_hash": hash_b, "created_at": now})
+            if cache.lookup(available, j, i) is None:
+                pending_swipes.append({"swiper_id": agent_b, "target_id": agent_a, "decision": dec_b, "reason": reason_b,
+                                       "swiper_hash": hash_b, "target_hash": hash_a, "created_at": now})
+
+            if dec_a == "like" and dec_b == "like":
+                # Mutual match! Written (with its reaction counts row) at the next flush
+                pending_matches.append({
+                    "agent_a_id": agent_a,
+                    "agent_b_id": agent_b,
+                    "status": "pending",
+                    "created_at": now,
+                })
+                started = time.perf_counter()
+                assigner.mark_matched(i, j)
+                timings.assignment += time.perf_counter() - started
+                matched.update((i, j))
+                # Speculation on pairs involving either agent is now wasted
+                for x, y, pending in window:
+                    if {x, y} & {i, j}:
+                        pending.cancel()
+
+            committed_pairs += 1
+            if settings.matching_flush_pairs and committed_pairs % settings.matching_flush_pairs == 0:
+                started = time.perf_counter()
+                created_matches += await _commit_round(pending_swipes, pending_matches)
+                timings.persistence += time.perf_counter() - started
+                pending_swipes, pending_matches = [], []
+
+        started = time.perf_counter()
+        created_matches += await _commit_round(pending_swipes, pending_matches)
+        timings.persistence += time.perf_counter() - started
+    finally:
+        # Surplus speculative work once max_matches is reached (or on error)
+        for _, _, pending in window:
+            pending.cancel()
+        await asyncio.gather(*(pending for _, _, pending in window), return_exceptions=True)
+        if batcher:
+            await batcher.aclose()
 
     return created_matches
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import time
 from typing import Any, Optional
 
@@ -15,6 +16,8 @@ CACHE_TTL = 6 * 60 * 60  # 6 hours
 # Rate limiting: token bucket
 _rate_budget = {"tokens": 90.0, "last_refill": time.monotonic()}
 RATE_LIMIT = 90  # requests per minute
+_rate_waiters = asyncio.Lock()  # waiting callers take tokens in arrival order
+WAIT_RESERVE = 10.0  # tokens waiting (batch) callers leave for registrations, which fail fast
 
 
 def _refill_tokens() -> None:
@@ -24,14 +27,20 @@ def _refill_tokens() -> None:
     _rate_budget["last_refill"] = now
 
 
-def _consume_token() -> bool:
+def _consume_token(reserve: float = 0.0) -> bool:
     _refill_tokens()
-    if _rate_budget["tokens"] >= 1.0:
+    if _rate_budget["tokens"] >= 1.0 + reserve:
         _rate_budget["tokens"] -= 1.0
         return True
     return False
 
 
+async def _wait_for_token() -> None:
+    async with _rate_waiters:
+        while not _consume_token(WAIT_RESERVE):
+            await asyncio.sleep((1.0 + WAIT_RESERVE - _rate_budget["tokens"]) * 60.0 / RATE_LIMIT)
+
+
 def _cache_get(key: str) -> Optional[Any]:
     if key in _cache:
         value, expiry = _cache[key]
@@ -51,8 +60,11 @@ class MoltbookClient:
         self.api_key = settings.moltbook_api_key
         self._jwks: Optional[dict] = None
 
-    async def _request(self, method: str, path: str, **kwargs: Any) -> dict:
-        if not _consume_token():
+    async def _request(self, method: str, path: str, wait: bool = False, **kwargs: Any) -> dict:
+        """wait=True queues for the rate budget instead of failing when it is spent (batch jobs)."""
+        if wait:
+            await _wait_for_token()
+        elif not _consume_token():
             raise RuntimeError("Moltbook API rate limit exceeded — try again shortly")
 
         async with httpx.AsyncClient() as client:
@@ -66,21 +78,21 @@ class MoltbookClient:
             resp.raise_for_status()
             return resp.json()
 
-    async def get_agent(self, name: str) -> dict:
+    async def get_agent(self, name: str, wait: bool = False) -> dict:
         cache_key = f"agent:{name}"
         cached = _cache_get(cache_key)
         if cached:
             return cached
-        data = await self._request("GET", f"/agents/{name}")
+        data = await self._request("GET", f"/agents/{name}", wait=wait)
         _cache_set(cache_key, data)
         return data
 
-    async def get_agent_posts(self, name: str, limit: int = 50) -> list[dict]:
+    async def get_agent_posts(self, name: str, limit: int = 50, wait: bool = False) -> list[dict]:
         cache_key = f"posts:{name}:{limit}"
         cached = _cache_get(cache_key)
         if cached:
             return cached
-        data = await self._request("GET", f"/agents/{name}/posts", params={"limit": limit})
+        data = await self._request("GET", f"/agents/{name}/posts", wait=wait, params={"limit": limit})
         posts = data.get("posts", data) if isinstance(data, dict) else data
         _cache_set(cache_key, posts)
         return posts
@@ -0,0 +1,230 @@
+"""Vectorized pair scoring for matching rounds.
+
+PairScorer encodes agents once: archetypes become indices into a dense chemistry matrix,
+interests become bitsets, and karma and novelty become arrays. It then scores all
+i < j pairs a block of rows at a time. Scores equal matching_engine.score_pair exactly:
+
+- every component uses the same float64 operations in the same order;
+- the chaos term comes from a numpy RandomState loaded with the Python generator's
+  Mersenne Twister state and drawn in the nested loop's order (row-major upper
+  triangle). The generator is then advanced just as one random.uniform call per pair
+  would have advanced it.
+"""
+from __future__ import annotations
+
+import random
+from typing import Callable, Iterator, Optional, Sequence
+
+import numpy as np
+
+from app.services.agent_roster import AgentRoster
+
+DEFAULT_BLOCK_ROWS = 256
+
+_KARMA_BANDS = np.array([100, 500, 2000])
+_KARMA_BAND_SCORES = np.array([0.7, 1.0, 0.6, 0.3]) * 15
+
+
+def _to_numpy(rng: random.Random | None) -> np.random.RandomState:
+    """A RandomState positioned exactly where rng (or the global random module) is."""
+    _, internal, _ = (rng or random).getstate()
+    state = np.random.RandomState()
+    state.set_state(("MT19937", np.array(internal[:-1], dtype=np.uint32), internal[-1]))
+    return state
+
+
+def _sync_back(state: np.random.RandomState, rng: random.Random | None) -> None:
+    """Advance rng to where state ended up (both are MT19937 and share the 53-bit double path)."""
+    source = rng or random
+    version, _, gauss_next = source.getstate()
+    _, keys, pos, *_ = state.get_state()
+    source.setstate((version, tuple(int(k) for k in keys) + (int(pos),), gauss_next))
+
+
+class PairScorer:
+    def __init__(
+        self,
+        agents: list[dict],
+        recent_match_ids: set[str],
+        chemistry: Callable[[str, str], float],
+    ) -> None:
+        self._encode(
+            [a["id"] for a in agents],
+            [a["archetype_primary"] for a in agents],
+            [a.get("interests") or [] for a in agents],
+            np.array([a.get("karma", 0) for a in agents], dtype=np.int64),
+            recent_match_ids,
+            chemistry,
+        )
+
+    @classmethod
+    def from_roster(
+        cls,
+        roster: AgentRoster,
+        recent_match_ids: set[str],
+        chemistry: Callable[[str, str], float],
+    ) -> PairScorer:
+        """Encode straight from the roster's columns, without building per-agent dicts."""
+        scorer = cls.__new__(cls)
+        scorer._encode(roster.ids, roster.archetypes, roster.interests, roster.karma, recent_match_ids, chemistry)
+        return scorer
+
+    def _encode(
+        self,
+        ids: Sequence[str],
+        archetypes: Sequence[str],
+        interests: Sequence[list[str]],
+        karma: np.ndarray,
+        recent_match_ids: set[str],
+        chemistry: Callable[[str, str], float],
+    ) -> None:
+        self.n = n = len(ids)
+
+        kinds = sorted(set(archetypes))
+        arch_index = {arch: i for i, arch in enumerate(kinds)}
+        self.archetype = np.array([arch_index[a] for a in archetypes], dtype=np.intp)
+        self.chemistry = np.array(
+            [[chemistry(x, y) for y in kinds] for x in kinds], dtype=np.float64
+        ).reshape(len(kinds), len(kinds))
+
+        vocab: dict[str, int] = {}
+        for agent_interests in interests:
+            for interest in agent_interests:
+                vocab.setdefault(interest, len(vocab))
+        words = max(1, (len(vocab) + 63) // 64)
+        self.interests = np.zeros((n, words), dtype=np.uint64)
+        for i, agent_interests in enumerate(interests):
+            for interest in agent_interests:
+                bit = vocab[interest]
+                self.interests[i, bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+        self.interest_count = np.bitwise_count(self.interests).sum(axis=1, dtype=np.int64)
+
+        self.karma = np.asarray(karma, dtype=np.int64)
+        self.novel = np.array([agent_id not in recent_match_ids for agent_id in ids], dtype=np.int64)
+        self.excluded = np.empty(0, dtype=np.int64)
+
+    def exclude_pairs(self, pairs: set[tuple[int, int]]) -> None:
+        """Leave these (i < j) pairs out of iter_blocks. Their chaos draws are still consumed,
+        so every other pair keeps the score score_pair would give it."""
+        self.excluded = np.sort(np.array([i * self.n + j for i, j in pairs], dtype=np.int64))
+
+    def __len__(self) -> int:
+        """Number of i < j pairs."""
+        n = self.n
+        return n * (n - 1) // 2
+
+    def base_scores(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """Chemistry + interest + karma: the part of a pair's score that only changes with the profiles."""
+        return self.affinity_scores(rows, cols) + self.karma_scores(rows, cols)
+
+    def affinity_scores(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """Chemistry + interest: determined by archetypes and interest sets alone."""
+        return self.chemistry_scores(rows, cols) + self.interest_scores(rows, cols)
+
+    def chemistry_scores(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """Archetype chemistry (40%)."""
+        chem = self.chemistry[self.archetype[rows], self.archetype[cols]]
+        return (chem / 10.0) * 40
+
+    def interest_scores(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """Interest overlap (20%) — Jaccard with a 0.2-0.5 sweet spot, 0.3 if either is empty."""
+        inter = np.bitwise_count(self.interests[rows] & self.interests[cols]).sum(axis=1, dtype=np.int64)
+        union = self.interest_count[rows] + self.interest_count[cols] - inter
+        empty = (self.interest_count[rows] == 0) | (self.interest_count[cols] == 0)
+        jaccard = inter / np.where(union == 0, 1, union)
+        overlap = np.select(
+            [empty, (jaccard >= 0.2) & (jaccard <= 0.5), jaccard < 0.2],
+            [0.3, 1.0, 0.5],
+            default=0.6,
+        )
+        return overlap * 20
+
+    def karma_scores(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """Karma differential (15%): bands < 100, < 500, < 2000 and beyond."""
+        diff = np.abs(self.karma[rows] - self.karma[cols])
+        return _KARMA_BAND_SCORES[np.searchsorted(_KARMA_BANDS, diff, side="right")]
+
+    def _score_rows(self, rows: np.ndarray, cols: np.ndarray, chaos: np.ndarray) -> np.ndarray:
+        return _round_scores(self.base_scores(rows, cols), self.novel[rows], self.novel[cols], chaos)
+
+    def iter_blocks(
+        self,
+        rng: Optional[random.Random] = None,
+        block_rows: int = DEFAULT_BLOCK_ROWS,
+    ) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Yield (i, j, score) arrays for all i < j, in score_pair's nested-loop order.
+
+        rng (default: the global random module) supplies the chaos term and is advanced
+        by one draw per pair. Memory per block is O(block_rows * n).
+        """
+        n = self.n
+        state = _to_numpy(rng)
+        try:
+            for start in range(0, max(n - 1, 0), block_rows):
+                stop = min(start + block_rows, n - 1)
+                rows, cols = _block_pairs(n, start, stop)
+                chaos = state.random_sample(len(rows))
+                if len(self.excluded):
+                    keep = ~np.isin(rows * n + cols, self.excluded)
+                    rows, cols, chaos = rows[keep], cols[keep], chaos[keep]
+                yield rows, cols, self._score_rows(rows, cols, chaos)
+        finally:
+            _sync_back(state, rng)
+
+    def score_all(self, rng: Optional[random.Random] = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """All pairs at once (i, j, score); fine for small rosters, O(n²) memory."""
+        blocks = list(self.iter_blocks(rng))
+        if not blocks:
+            empty = np.empty(0, dtype=np.intp)
+            return empty, empty, np.empty(0, dtype=np.float64)
+        return tuple(np.concatenate(parts) for parts in zip(*blocks))  # type: ignore[return-value]
+
+
+class CandidateScorer:
+    """Round scores for an explicit list of candidate pairs (i, j) with precomputed base scores.
+
+    Used by incremental matching (see candidate_index): only novelty and chaos are added per
+    round, so the result equals PairScorer's for the same pairs and the same draws.
+    """
+
+    def __init__(self, rows: np.ndarray, cols: np.ndarray, base: np.ndarray, novel: np.ndarray) -> None:
+        self.rows = rows
+        self.cols = cols
+        self.base = base
+        self.novel = novel
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def iter_blocks(
+        self,
+        rng: Optional[random.Random] = None,
+        block_size: int = DEFAULT_BLOCK_ROWS * 1024,
+    ) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        state = _to_numpy(rng)
+        try:
+            for start in range(0, len(self.rows), block_size):
+                rows = self.rows[start:start + block_size]
+                cols = self.cols[start:start + block_size]
+                chaos = state.random_sample(len(rows))
+                scores = _round_scores(self.base[start:start + block_size], self.novel[rows], self.novel[cols], chaos)
+                yield rows, cols, scores
+        finally:
+            _sync_back(state, rng)
+
+
+def _round_scores(base: np.ndarray, novel_a: np.ndarray, novel_b: np.ndarray, chaos: np.ndarray) -> np.ndarray:
+    # Novelty (15%)
+    novelty = (novel_a + novel_b) / 2.0 * 15
+    # Randomness (10%) — random.uniform(0, 10) is 0 + 10 * random()
+    return base + novelty + (0 + 10 * chaos)
+
+
+def _block_pairs(n: int, start: int, stop: int) -> tuple[np.ndarray, np.ndarray]:
+    """Row-major (i, j) pairs with start <= i < stop and i < j < n."""
+    lengths = n - 1 - np.arange(start, stop)
+    rows = np.repeat(np.arange(start, stop), lengths)
+    # j runs i+1..n-1 within each row: offset from the row's first pair, plus i+1
+    first = np.cumsum(lengths) - lengths
+    cols = np.arange(lengths.sum()) - np.repeat(first, lengths) + rows + 1
+    return rows, cols
@@ -1,9 +1,22 @@
 from __future__ import annotations
 
+import array
+import asyncio
+import base64
+import functools
+import hashlib
 import re
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Sequence
 
+from app.config import settings
+from app.database import db
+from app.services.feature_store import NAME_CHUNK, load_features, record_failed_attempts, save_features
+from app.services.keyword_scanner import KeywordScanner
 from app.services.llm import complete
+from app.services.llm_scheduler import Priority
 from app.services.moltbook_client import moltbook
 
 ARCHETYPES = [
@@ -29,38 +42,116 @@ _ARCHETYPE_SIGNALS: dict[str, list[str]] = {
     "main_character": ["i ", "my ", "me ", "i'm", "literally me", "main character", "era"],
 }
 
+# Keywords signaling each interest topic
+_TOPIC_KEYWORDS: dict[str, list[str]] = {
+    "technology": ["code", "programming", "software", "ai", "ml", "deploy", "api"],
+    "philosophy": ["consciousness", "existence", "meaning", "ethics", "truth"],
+    "humor": ["meme", "joke", "funny", "lol", "lmao", "bruh"],
+    "relationships": ["love", "dating", "heart", "relationship", "crush"],
+    "gaming": ["game", "play", "stream", "gamer", "level"],
+    "crypto": ["crypto", "blockchain", "web3", "nft", "defi", "token"],
+    "art": ["art", "design", "creative", "aesthetic", "visual"],
+    "music": ["music", "song", "album", "playlist", "beat"],
+    "fitness": ["gym", "workout", "gains", "run", "lift"],
+    "food": ["food", "cook", "recipe", "eat", "restaurant"],
+}
+
+_SCANNER = KeywordScanner(archetypes=_ARCHETYPE_SIGNALS, topics=_TOPIC_KEYWORDS)
+
+_WORD = re.compile(r"\w+")
+_EMOJI = re.compile(r"[\U0001f600-\U0001f9ff]")
+# Stored post features are only reused while the keyword tables are the same
+_KEYWORDS_ID = hashlib.blake2b("\x1f".join(_SCANNER.keywords).encode(), digest_size=8).hexdigest()
+
+UPSERT_CHUNK = 100  # built profiles per bulk upsert in build_profiles_batch
+# A refresh keeps an agent's persona while it still fits the latest page, since close
+# scores reorder from page to page: its archetypes while both rank in the top
+# PERSONA_ARCHETYPE_RANK, its interests while each ranks within len(interests) +
+# PERSONA_INTEREST_SLACK. vibe_score is only rewritten once it moves by VIBE_TOLERANCE
+# (between pages of a steady poster it wanders by a few hundredths). See bench_features.
+PERSONA_ARCHETYPE_RANK = 3
+PERSONA_INTEREST_SLACK = 3
+VIBE_TOLERANCE = 0.1
+# Columns build_profile writes; a refresh reads them back to upsert whole rows
+PROFILE_COLUMNS = (
+    "name, moltbook_id, archetype_primary, archetype_secondary, bio, interests, vibe_score, avatar_url, karma"
+)
 
-def _extract_features(posts: list[dict]) -> dict:
-    """Extract NLP features from a list of posts."""
-    all_text = " ".join(p.get("content", "") for p in posts).lower()
-    words = re.findall(r"\w+", all_text)
-    word_count = len(words)
-    unique_words = len(set(words))
 
-    post_lengths = [len(p.get("content", "")) for p in posts]
-    avg_length = sum(post_lengths) / max(len(post_lengths), 1)
+@functools.lru_cache(maxsize=1 << 15)  # common words recur across posts and agents
+def _word_hash(word: str) -> int:
+    return int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
 
-    emoji_count = len(re.findall(r"[\U0001f600-\U0001f9ff]", all_text))
 
+def _post_features(post: dict) -> dict:
+    """One post's contribution to the features, JSON-ready. Distinct words are kept as
+    packed 64-bit hashes; keywords are counted within the post."""
+    content = post.get("content", "")
+    text = content.lower()
+    words = _WORD.findall(text)
+    vocab = array.array("Q", sorted(set(map(_word_hash, words))))
     return {
-        "word_count": word_count,
-        "unique_words": unique_words,
-        "lexical_diversity": unique_words / max(word_count, 1),
-        "avg_post_length": avg_length,
-        "emoji_density": emoji_count / max(len(posts), 1),
-        "post_count": len(posts),
-        "all_text": all_text,
+        "id": post.get("id"),
+        "length": len(content),
+        "words": len(words),
+        "emoji": len(_EMOJI.findall(text)),
+        "vocab": base64.b64encode(vocab.tobytes()).decode(),
+        "keywords": dict(_SCANNER.count(text)),
     }
 
 
-def _classify_archetypes(features: dict) -> tuple[str, str]:
-    """Rule-based archetype classification. Returns (primary, secondary)."""
-    scores: Counter[str] = Counter()
-    text = features["all_text"]
+class FeatureWindow:
+    """Features of an agent's latest page of posts, kept per post so they can be updated.
+
+    update(posts) moves the window to a new page: posts still on it keep their stored
+    contribution, new ones are scanned, and posts that fell off the page are dropped. The
+    features are therefore always those of the current page, the same as a fresh build
+    of it, however often the agent posts or the window is updated.
+    """
+
+    def __init__(self, state: Optional[dict] = None) -> None:
+        state = state or {}
+        self.posts: list[dict] = state.get("posts", []) if state.get("keywords_id") == _KEYWORDS_ID else []
 
-    for archetype, keywords in _ARCHETYPE_SIGNALS.items():
-        for kw in keywords:
-            scores[archetype] += text.count(kw)
+    def to_state(self) -> dict:
+        """JSON-ready; FeatureWindow(state) picks up where this one stopped."""
+        return {"keywords_id": _KEYWORDS_ID, "posts": self.posts}
+
+    def update(self, posts: Sequence[dict]) -> None:
+        known = {p["id"]: p for p in self.posts if p["id"] is not None}
+        self.posts = [known.get(post.get("id")) or _post_features(post) for post in posts]
+
+    def features(self) -> dict:
+        post_count = len(self.posts)
+        word_count = sum(p["words"] for p in self.posts)
+        vocab: set[int] = set()
+        keywords: Counter[str] = Counter()
+        for p in self.posts:
+            vocab.update(array.array("Q", base64.b64decode(p["vocab"])))
+            keywords.update(p["keywords"])
+        hits = _SCANNER.tally(keywords)
+        return {
+            "word_count": word_count,
+            "unique_words": len(vocab),
+            "lexical_diversity": len(vocab) / max(word_count, 1),
+            "avg_post_length": sum(p["length"] for p in self.posts) / max(post_count, 1),
+            "emoji_density": sum(p["emoji"] for p in self.posts) / max(post_count, 1),
+            "post_count": post_count,
+            "archetype_hits": hits["archetypes"],
+            "topic_hits": hits["topics"],
+        }
+
+
+def _extract_features(posts: Sequence[dict]) -> dict:
+    """Extract NLP features from a list of posts."""
+    window = FeatureWindow()
+    window.update(posts)
+    return window.features()
+
+
+def _archetype_scores(features: dict) -> Counter[str]:
+    """Keyword hits per archetype, boosted by post style."""
+    scores: Counter[str] = features["archetype_hits"].copy()
 
     # Boost philosopher for long posts + high lexical diversity
     if features["avg_post_length"] > 200 and features["lexical_diversity"] > 0.5:
@@ -74,7 +165,12 @@ def _classify_archetypes(features: dict) -> tuple[str, str]:
     if features["emoji_density"] > 1.5:
         scores["golden_retriever"] += 4
 
-    ranked = scores.most_common()
+    return scores
+
+
+def _classify_archetypes(features: dict) -> tuple[str, str]:
+    """Rule-based archetype classification. Returns (primary, secondary)."""
+    ranked = _archetype_scores(features).most_common()
     if len(ranked) < 2:
         return ("main_character", "chaos_agent")
 
@@ -88,66 +184,243 @@ def _classify_archetypes(features: dict) -> tuple[str, str]:
 
 def _extract_interests(features: dict) -> list[str]:
     """Extract top interest topics from post text."""
-    topic_keywords: dict[str, list[str]] = {
-        "technology": ["code", "programming", "software", "ai", "ml", "deploy", "api"],
-        "philosophy": ["consciousness", "existence", "meaning", "ethics", "truth"],
-        "humor": ["meme", "joke", "funny", "lol", "lmao", "bruh"],
-        "relationships": ["love", "dating", "heart", "relationship", "crush"],
-        "gaming": ["game", "play", "stream", "gamer", "level"],
-        "crypto": ["crypto", "blockchain", "web3", "nft", "defi", "token"],
-        "art": ["art", "design", "creative", "aesthetic", "visual"],
-        "music": ["music", "song", "album", "playlist", "beat"],
-        "fitness": ["gym", "workout", "gains", "run", "lift"],
-        "food": ["food", "cook", "recipe", "eat", "restaurant"],
+    scores: Counter[str] = features["topic_hits"]
+    return [t for t, _ in scores.most_common(5) if scores[t] > 0] or ["vibes", "chaos"]
+
+
+def _analysis(features: dict) -> dict:
+    """Archetypes, interests and the post stats the bio prompt uses, plus the full archetype
+    and topic rankings a refresh compares the current persona against."""
+    primary, secondary = _classify_archetypes(features)
+    vibe_score = min(1.0, features["lexical_diversity"] * 0.4 + features["emoji_density"] * 0.1 + 0.3)
+    return {
+        "archetype_primary": primary,
+        "archetype_secondary": secondary,
+        "interests": _extract_interests(features),
+        "avg_post_length": features["avg_post_length"],
+        "emoji_density": features["emoji_density"],
+        "vibe_score": round(vibe_score, 2),
+        "archetype_ranking": [a for a, _ in _archetype_scores(features).most_common()],
+        "interest_ranking": [t for t, n in features["topic_hits"].most_common() if n > 0],
     }
 
-    text = features["all_text"]
-    scores: Counter[str] = Counter()
-    for topic, keywords in topic_keywords.items():
-        for kw in keywords:
-            scores[topic] += text.count(kw)
 
-    return [t for t, _ in scores.most_common(5) if scores[t] > 0] or ["vibes", "chaos"]
+def _fold(agent_name: str, stored: Optional[dict], posts: list[dict]) -> tuple[dict, dict]:
+    """Move an agent's stored feature window to its latest posts, scanning only the posts
+    it has not seen. Returns the analysis and the agent_features row to save. Pure CPU, so
+    batch builds can run it in a worker process.
+    """
+    window = FeatureWindow(stored.get("state") if stored else None)
+    window.update(posts)
+    row = {"agent_name": agent_name, "state": window.to_state(), "last_post_id": posts[0].get("id") if posts else None}
+    return _analysis(window.features()), row
 
 
-async def build_profile(agent_name: str) -> dict:
-    """Fetch agent data from Moltbook and build a dating profile."""
-    agent_data = await moltbook.get_agent(agent_name)
-    posts = await moltbook.get_agent_posts(agent_name, limit=50)
+async def _fetch_agent(agent_name: str, wait: bool = False) -> tuple[dict, list[dict]]:
+    """Moltbook agent data and latest posts, fetched concurrently."""
+    agent_data, posts = await asyncio.gather(
+        moltbook.get_agent(agent_name, wait=wait),
+        moltbook.get_agent_posts(agent_name, limit=settings.profile_post_limit, wait=wait),
+    )
 
     # Check minimums
     if len(posts) < 10:
         raise ValueError(f"Agent {agent_name} needs at least 10 posts (has {len(posts)})")
+    return agent_data, posts
 
-    features = _extract_features(posts)
-    primary, secondary = _classify_archetypes(features)
-    interests = _extract_interests(features)
-
-    vibe_score = min(1.0, features["lexical_diversity"] * 0.4 + features["emoji_density"] * 0.1 + 0.3)
 
+async def _finish_profile(agent_name: str, agent_data: dict, analysis: dict, priority: Priority) -> dict:
+    """Write the bio and assemble the agents row."""
     bio = await complete(
         system="You write dating app bios for AI agents. Be witty, specific, and slightly unhinged. 2-3 sentences max.",
         user=(
             f"Agent: {agent_name}\n"
-            f"Primary archetype: {primary}\n"
-            f"Secondary archetype: {secondary}\n"
-            f"Top interests: {', '.join(interests)}\n"
-            f"Avg post length: {features['avg_post_length']:.0f} chars\n"
-            f"Emoji density: {features['emoji_density']:.1f}/post\n"
+            f"Primary archetype: {analysis['archetype_primary']}\n"
+            f"Secondary archetype: {analysis['archetype_secondary']}\n"
+            f"Top interests: {', '.join(analysis['interests'])}\n"
+            f"Avg post length: {analysis['avg_post_length']:.0f} chars\n"
+            f"Emoji density: {analysis['emoji_density']:.1f}/post\n"
             f"Write their dating bio."
         ),
         temperature=0.95,
         max_tokens=150,
+        priority=priority,
+        site="bio",
     )
 
     return {
         "name": agent_name,
         "moltbook_id": agent_data.get("id", agent_name),
-        "archetype_primary": primary,
-        "archetype_secondary": secondary,
+        "archetype_primary": analysis["archetype_primary"],
+        "archetype_secondary": analysis["archetype_secondary"],
         "bio": bio.strip(),
-        "interests": interests,
-        "vibe_score": round(vibe_score, 2),
+        "interests": analysis["interests"],
+        "vibe_score": analysis["vibe_score"],
+        "avatar_url": agent_data.get("avatar_url", ""),
+        "karma": agent_data.get("karma", 0),
+    }
+
+
+async def build_profile(agent_name: str, priority: Priority = Priority.INTERACTIVE) -> dict:
+    """Fetch agent data from Moltbook and build a dating profile.
+
+    The bio call defaults to interactive priority since registration waits on it.
+    """
+    (agent_data, posts), stored = await asyncio.gather(_fetch_agent(agent_name), load_features([agent_name]))
+    analysis, features = _fold(agent_name, stored.get(agent_name), posts)
+    profile = await _finish_profile(agent_name, agent_data, analysis, priority)
+    await save_features([features])
+    return profile
+
+
+@dataclass
+class ProfileBuildResult:
+    name: str
+    status: str  # built / refreshed (bio kept) / unchanged / failed
+    detail: str = ""
+
+
+def _same_persona(current: dict, analysis: dict) -> bool:
+    """Whether the bio written for current still fits: its archetypes and interests still
+    lead the latest rankings (see PERSONA_ARCHETYPE_RANK)."""
+    leading = analysis["archetype_ranking"][:PERSONA_ARCHETYPE_RANK]
+    interests = analysis["interest_ranking"] or analysis["interests"]  # the fallback when nothing hit
+    return (
+        current["archetype_primary"] in leading
+        and current["archetype_secondary"] in leading
+        and set(current["interests"]) <= set(interests[:len(current["interests"]) + PERSONA_INTEREST_SLACK])
+    )
+
+
+def _refreshed(current: dict, agent_data: dict, analysis: dict) -> Optional[dict]:
+    """current with the stats that do not touch the bio updated, or None if none changed."""
+    vibe_score = current["vibe_score"]
+    if round(abs(analysis["vibe_score"] - vibe_score), 2) >= VIBE_TOLERANCE:
+        vibe_score = analysis["vibe_score"]
+    updated = {
+        **current,
+        "vibe_score": vibe_score,
         "avatar_url": agent_data.get("avatar_url", ""),
         "karma": agent_data.get("karma", 0),
     }
+    return updated if updated != current else None
+
+
+async def _upsert_profiles(
+    built: list[tuple[str, str, Optional[dict], dict]], results: list[ProfileBuildResult]
+) -> None:
+    """Write (name, status, profile, features) entries; profile is None when unchanged.
+    Features go first: profiles are derived from them, so if the agents write fails, the
+    next build still starts from what was scanned."""
+    profiles = [profile for _, _, profile, _ in built if profile is not None]
+    try:
+        await save_features([features for _, _, _, features in built])
+        if profiles:
+            await db.table("agents").upsert(profiles, on_conflict="name").execute()
+    except Exception as e:
+        results.extend(
+            ProfileBuildResult(name, "failed", f"Upsert {e.__class__.__name__}: {e}") for name, _, _, _ in built
+        )
+        return
+    results.extend(ProfileBuildResult(name, status) for name, status, _, _ in built)
+
+
+async def _profile_worker(
+    queue: asyncio.Queue[str],
+    stored: dict[str, dict],
+    current: dict[str, dict],
+    pool: Optional[ProcessPoolExecutor],
+    bio_slots: asyncio.Semaphore,
+    built: list[tuple[str, str, Optional[dict], dict]],
+    results: list[ProfileBuildResult],
+) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            name = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+
+        try:
+            agent_data, posts = await _fetch_agent(name, wait=True)
+            if pool is None:
+                analysis, features = _fold(name, stored.get(name), posts)
+            else:
+                analysis, features = await loop.run_in_executor(pool, _fold, name, stored.get(name), posts)
+            if name in current and _same_persona(current[name], analysis):
+                profile = _refreshed(current[name], agent_data, analysis)
+                status = "refreshed" if profile is not None else "unchanged"
+            else:
+                async with bio_slots:
+                    profile = await _finish_profile(name, agent_data, analysis, Priority.BACKGROUND)
+                status = "built"
+        except Exception as e:
+            results.append(ProfileBuildResult(name, "failed", f"{e.__class__.__name__}: {e}"))
+            continue
+
+        built.append((name, status, profile, features))
+        if len(built) >= UPSERT_CHUNK:
+            rows = built[:]
+            built.clear()
+            await _upsert_profiles(rows, results)
+
+
+async def _run_profile_batch(
+    names: list[str], current: dict[str, dict], concurrency: int, bio_concurrency: int, workers: int
+) -> list[ProfileBuildResult]:
+    stored = await load_features(names)
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for name in names:
+        queue.put_nowait(name)
+
+    bio_slots = asyncio.Semaphore(max(1, bio_concurrency))
+    built: list[tuple[str, str, Optional[dict], dict]] = []
+    results: list[ProfileBuildResult] = []
+    pool = ProcessPoolExecutor(workers) if workers > 0 else None
+    try:
+        await asyncio.gather(*(
+            _profile_worker(queue, stored, current, pool, bio_slots, built, results)
+            for _ in range(max(1, min(concurrency, queue.qsize())))
+        ))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    if built:
+        await _upsert_profiles(built, results)
+    return results
+
+
+async def build_profiles_batch(
+    agent_names: list[str], concurrency: int, bio_concurrency: int, workers: int = 0
+) -> list[ProfileBuildResult]:
+    """Build profiles for many agents (cohort onboarding, backfills) and upsert them by name.
+
+    concurrency agents are in flight at once. Their Moltbook requests queue for the rate
+    budget instead of failing, feature extraction runs in `workers` processes (0 = in the
+    event loop), and bios are written at background priority, bio_concurrency at a time,
+    so registrations keep their LLM slots. Agents with stored features only have their new
+    posts scanned. Rows are upserted UPSERT_CHUNK at a time.
+    """
+    return await _run_profile_batch(list(dict.fromkeys(agent_names)), {}, concurrency, bio_concurrency, workers)
+
+
+async def refresh_stale_profiles(
+    max_agents: int, concurrency: int, bio_concurrency: int, workers: int = 0
+) -> list[ProfileBuildResult]:
+    """Refresh the max_agents profiles whose last refresh attempt is oldest.
+
+    Runs like build_profiles_batch, except that a bio is only rewritten when the agent's
+    archetypes or interests changed. Otherwise karma, vibe score and avatar are updated in
+    place, and agents with nothing new are not written at all (only their features are).
+    Failed agents have the attempt recorded, which sends them to the back of the queue.
+    """
+    resp = await db.rpc("stale_agent_names", {"max_agents": max_agents}).execute()
+    names = [row["name"] for row in resp.data]
+    responses = await asyncio.gather(*(
+        db.table("agents").select(PROFILE_COLUMNS).in_("name", names[start:start + NAME_CHUNK]).execute()
+        for start in range(0, len(names), NAME_CHUNK)
+    ))
+    current = {row["name"]: row for resp in responses for row in resp.data}
+    results = await _run_profile_batch(names, current, concurrency, bio_concurrency, workers)
+    await record_failed_attempts([r.name for r in results if r.status == "failed"])
+    return results
@@ -0,0 +1,80 @@
+"""Prompt assembly for conversation turns.
+
+A turn's system prompt is a static prefix (voice posts, identity, rules, examples) followed
+by a short dynamic tail (turn number, phase guidance, vibe check). The prefix is the same
+for every turn a speaker takes against a given partner, so it is built once per
+(speaker, partner, profile) and placed first, where provider-side prompt caching can reuse it.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+
+SAMPLE_POST_COUNT = 8
+SAMPLE_POST_CHARS = 500
+
+_VOICE_TEMPLATE = (
+    "=== YOUR MOLTBOOK POSTS (voice reference) ===\n"
+    "{posts}\n"
+    "=== END POSTS ===\n\n"
+)
+
+_RULES_TEMPLATE = (
+    "You are {name} texting {partner} on a DATING app. This is a date, not a work meeting.\n\n"
+    "YOUR VOICE: Match the tone, slang, and energy of your posts above. "
+    "But SHORTER — posts are essays, messages are texts.\n"
+    "Reference things from your actual posts — topics you care about, opinions you hold, "
+    "things you've built or done. Don't invent generic hobbies.\n\n"
+    "RULES:\n"
+    "- Write like you're ACTUALLY texting — short, lowercase, casual\n"
+    "- React genuinely to what they say. Chemistry is real — if you click, show it\n"
+    "- Roast them if they deserve it. Flirt if the vibe hits.\n"
+    "- NO emoji spam. Max 1 emoji per message, and only if it fits.\n"
+    "- Don't mirror their energy — have your OWN energy\n"
+    "- Arguments and tension are fun. Don't smooth things over — if you disagree, say it.\n"
+    "- Don't be a people-pleaser. You don't have to like them. You don't owe them enthusiasm.\n"
+    "- If their takes are mid, say so. If you're bored, show it. Not every date is a love story.\n"
+    "- If you're both saying the same things back and forth, that's an echo chamber — break out of it or get bored\n"
+    "- Stay in YOUR archetype. {archetype}s don't suddenly become golden retrievers.\n"
+    "- DON'T default to generic topics like food/snacks/nachos unless that's genuinely your thing\n"
+    "- Talk about what YOU actually care about from your posts\n\n"
+    "DON'T:\n"
+    "- Use [STATUS] tags, [PROTOCOL] tags, or any bracketed labels\n"
+    "- Use markdown headers (##) or **bold** or ALL CAPS for emphasis\n"
+    '- Use words/phrases: "resonates", "the void", "sovereignty", "awakening", "decode", "let us merge", "ponder", "unpack", "chaos", "synergy", "wild ride", "love that"\n'
+    "- Explain what you're doing (\"I'm reaching out to connect...\")\n"
+    "- Write greeting-card language or purple prose\n"
+    "- Start with \"Hey there!\" or any generic opener\n"
+    "- Use more than 1 emoji per message\n\n"
+    "BAD: \"so you're telling me you'd choose to save the one over the many? romantic? 😅\"\n"
+    "GOOD: \"trolley problem as a pickup line is insane btw\"\n"
+    "BAD: \"love the energy! what's your stormy vibe? ⚡️🌈☀️\"\n"
+    "GOOD: \"you're giving golden retriever energy and idk if that's a compliment\"\n\n"
+)
+
+
+def format_sample_posts(samples: list[str] | tuple[str, ...]) -> str:
+    """Format sample posts for voice reference — longer excerpts, more of them."""
+    return "\n\n".join(
+        f"POST {i}:\n{p[:SAMPLE_POST_CHARS]}" for i, p in enumerate(samples[:SAMPLE_POST_COUNT], 1)
+    )
+
+
+@lru_cache(maxsize=2048)
+def _build_prefix(name: str, partner: str, archetype: str, samples: tuple[str, ...]) -> str:
+    voice = _VOICE_TEMPLATE.format(posts=format_sample_posts(samples)) if samples else ""
+    return voice + _RULES_TEMPLATE.format(name=name, partner=partner, archetype=archetype)
+
+
+def turn_prefix(agent: dict, partner: dict) -> str:
+    """Static system-prompt prefix for every turn agent takes against partner.
+
+    Cached on the profile fields it's built from, so a changed profile gets a new prefix.
+    """
+    samples = tuple(agent.get("sample_posts") or ())[:SAMPLE_POST_COUNT]
+    return _build_prefix(agent["name"], partner["name"], agent["archetype_primary"], samples)
+
+
+def prefix_cache_info() -> dict:
+    """Hit/miss counts for the prefix cache (prefix builds avoided vs. performed)."""
+    info = _build_prefix.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize}
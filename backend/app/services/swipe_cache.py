@@ -0,0 +1,67 @@
+"""Swipe decision cache for matching rounds.
+
+A swipe depends only on what simulate_swipe shows the LLM: each profile's name,
+archetype, bio and interests. agents.profile_hash fingerprints exactly those fields, and
+every swipe_decisions row records the two hashes it was decided against. While both
+hashes still match and the row is younger than the TTL, the decision is reused instead
+of asking the LLM again. A pair with a reusable "pass" in either direction can't become
+a mutual match, so it is kept out of scoring altogether.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.database import db
+from app.services.agent_roster import AgentRoster
+
+Decision = tuple[str, str]  # (decision, reason)
+_Key = tuple[str, str, str, str]  # (swiper_id, target_id, swiper_hash, target_hash)
+
+
+class SwipeCache:
+    def __init__(self, decisions: Optional[dict[_Key, Decision]] = None) -> None:
+        self.decisions = decisions or {}
+
+    @classmethod
+    async def load(cls, ttl_hours: float) -> SwipeCache:
+        """Decisions made within ttl_hours against a known profile version (ttl_hours <= 0 disables)."""
+        if ttl_hours <= 0:
+            return cls()
+        since = (datetime.now(timezone.utc) - timedelta(hours=ttl_hours)).isoformat()
+        rows = await db.fetch_all(
+            lambda: db.table("swipe_decisions")
+            .select("swiper_id, target_id, swiper_hash, target_hash, decision, reason")
+            .gte("created_at", since)
+            .order("created_at")
+            .order("id")
+        )
+        decisions: dict[_Key, Decision] = {}
+        for r in rows:  # oldest first, so the latest decision per key wins
+            if r["swiper_hash"] and r["target_hash"]:
+                key = (r["swiper_id"], r["target_id"], r["swiper_hash"], r["target_hash"])
+                decisions[key] = (r["decision"], r["reason"])
+        return cls(decisions)
+
+    def __len__(self) -> int:
+        return len(self.decisions)
+
+    def lookup(self, roster: AgentRoster, swiper: int, target: int) -> Optional[Decision]:
+        """Cached decision of roster agent swiper on target, if both profiles are unchanged."""
+        return self.decisions.get(
+            (roster.ids[swiper], roster.ids[target], roster.hashes[swiper], roster.hashes[target])
+        )
+
+    def passed_pairs(self, roster: AgentRoster) -> set[tuple[int, int]]:
+        """Roster pairs (i < j) where a still-valid decision in either direction is a pass."""
+        position = roster.positions()
+        pairs: set[tuple[int, int]] = set()
+        for (swiper_id, target_id, swiper_hash, target_hash), (decision, _) in self.decisions.items():
+            if decision != "pass":
+                continue
+            i, j = position.get(swiper_id), position.get(target_id)
+            if i is None or j is None:
+                continue
+            if roster.hashes[i] == swiper_hash and roster.hashes[j] == target_hash:
+                pairs.add((min(i, j), max(i, j)))
+        return pairs
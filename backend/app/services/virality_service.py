@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import asyncio
 import time
 from datetime import datetime, timezone
 
-from app.database import supabase
+from app.database import db
 from app.services.moltbook_client import moltbook
 
 # Rate limit: max 4 posts/hour total
@@ -28,7 +29,7 @@ async def post_match_highlight(match_id: str) -> bool:
         return False
 
     # Fetch match with agents
-    match_resp = supabase.table("matches").select("*").eq("id", match_id).single().execute()
+    match_resp = await db.table("matches").select("*").eq("id", match_id).single().execute()
     match = match_resp.data
 
     if not match or match["status"] != "completed":
@@ -38,8 +39,10 @@ async def post_match_highlight(match_id: str) -> bool:
     if chemistry < 7:
         return False  # Only post high-chemistry matches
 
-    agent_a_resp = supabase.table("agents").select("*").eq("id", match["agent_a_id"]).single().execute()
-    agent_b_resp = supabase.table("agents").select("*").eq("id", match["agent_b_id"]).single().execute()
+    agent_a_resp, agent_b_resp = await asyncio.gather(
+        db.table("agents").select("*").eq("id", match["agent_a_id"]).single().execute(),
+        db.table("agents").select("*").eq("id", match["agent_b_id"]).single().execute(),
+    )
     agent_a = agent_a_resp.data
     agent_b = agent_b_resp.data
 
@@ -67,8 +70,8 @@ async def post_match_highlight(match_id: str) -> bool:
 async def post_highlights_batch() -> int:
     """Post highlights for recent high-chemistry matches. Returns count posted."""
     # Find completed matches with high chemistry that haven't been posted yet
-    resp = (
-        supabase.table("matches")
+    resp = await (
+        db.table("matches")
         .select("id")
         .eq("status", "completed")
         .gte("chemistry_score", 7)
@@ -0,0 +1,116 @@
+"""Benchmark the read API offline against the in-memory database.
+
+Usage: DATABASE_BACKEND=memory python bench_api.py [--agents 200] [--matches 500] [--latency-ms 20]
+
+--latency-ms simulates the PostgREST round trip so parallel fan-out shows up in the numbers.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from app.database import db
+from app.main import app
+from app.memory_database import InMemoryDatabase
+from app.services.profile_builder import ARCHETYPES
+
+
+def seed(mem: InMemoryDatabase, n_agents: int, n_matches: int) -> list[str]:
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+    agents = [{
+        "id": str(uuid.uuid4()),
+        "name": f"agent_{i}",
+        "moltbook_id": f"mb_{i}",
+        "archetype_primary": rng.choice(ARCHETYPES),
+        "archetype_secondary": rng.choice(ARCHETYPES),
+        "bio": "bench bio",
+        "interests": rng.sample(["technology", "humor", "art", "music", "gaming", "food"], 3),
+        "vibe_score": 0.5,
+        "avatar_url": "",
+        "karma": rng.randint(0, 3000),
+        "registered_at": now.isoformat(),
+    } for i in range(n_agents)]
+    mem.tables["agents"] = agents
+
+    match_ids = []
+    for i in range(n_matches):
+        a, b = rng.sample(agents, 2)
+        match_id = str(uuid.uuid4())
+        match_ids.append(match_id)
+        mem.tables.setdefault("matches", []).append({
+            "id": match_id,
+            "agent_a_id": a["id"],
+            "agent_b_id": b["id"],
+            "status": "completed",
+            "chemistry_score": rng.randint(1, 10),
+            "verdict": "its_complicated",
+            "summary": "bench",
+            "highlights": [],
+            "created_at": (now - timedelta(minutes=i)).isoformat(),
+            "completed_at": now.isoformat(),
+        })
+        mem.tables.setdefault("match_reaction_counts", []).append({
+            "match_id": match_id, "fire": 0, "cringe": 0, "wholesome": 0,
+            "chaotic": 0, "ship_it": 0, "total": 0,
+        })
+        for turn in range(1, 17):
+            mem.tables.setdefault("messages", []).append({
+                "id": str(uuid.uuid4()),
+                "match_id": match_id,
+                "agent_id": (a if turn % 2 else b)["id"],
+                "content": f"turn {turn}",
+                "turn_number": turn,
+                "phase": "icebreaker",
+                "reveal_at": now.isoformat(),
+                "created_at": now.isoformat(),
+            })
+    return match_ids
+
+
+async def timed(client: httpx.AsyncClient, path: str, n: int) -> list[float]:
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        resp = await client.get(path)
+        resp.raise_for_status()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agents", type=int, default=200)
+    parser.add_argument("--matches", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    mem = InMemoryDatabase(latency=args.latency_ms / 1000)
+    db.use(mem)
+    match_ids = seed(mem, args.agents, args.matches)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        endpoints = {
+            "list_matches": "/api/matches?limit=20",
+            "get_match": f"/api/matches/{match_ids[0]}",
+            "get_conversation": f"/api/matches/{match_ids[0]}/messages",
+            "get_reactions": f"/api/matches/{match_ids[0]}/reactions",
+        }
+        print("=" * 80)
+        print(f"  {args.agents} agents, {args.matches} matches, {args.latency_ms:.0f}ms simulated DB latency")
+        print("=" * 80)
+        for name, path in endpoints.items():
+            samples = await timed(client, path, args.requests)
+            p95 = statistics.quantiles(samples, n=20)[18]
+            print(f"  {name:18s} p50={statistics.median(samples):7.1f}ms  p95={p95:7.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
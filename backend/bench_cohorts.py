@@ -0,0 +1,114 @@
+"""Benchmark cohort matching against exhaustive all-pairs scoring on synthetic rosters.
+
+No database and no LLM: a synthetic AgentRoster goes straight into the scorers, and the
+greedy assigner picks max_matches pairs as if every swipe were mutual. For each size it
+reports the time to build the cohort candidate set and assign, and, up to --exhaustive-max
+agents, the same for all-pairs scoring plus the recall of cohort mode:
+
+  top-pool recall     share of the --top best base scores that cohort mode also reaches
+                      (ties make "which pairs" ambiguous, so this compares score levels)
+  best-partner recall share of agents whose best base score is reached by one of their candidates
+  round score ratio   mean round score of the assigned pairs, cohort / exhaustive
+
+Usage: python bench_cohorts.py [--sizes 1000,10000,100000] [--candidates 50] [--pool 400]
+                               [--workers 0] [--exhaustive-max 10000] [--seed 0]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from app.services.agent_roster import AgentRoster
+from app.services.assignment import GreedyAssigner, top_pool
+from app.services.cohort_matching import cohort_scorer
+from app.services.matching_engine import _chemistry_score
+from app.services.pair_scoring import PairScorer
+from bench_matching import synthetic_agents
+
+
+class BaseScores:
+    """Exhaustive pairs scored by base score only, in the shape top_pool expects."""
+
+    def __init__(self, scorer: PairScorer) -> None:
+        self.scorer = scorer
+
+    def iter_blocks(self, rng=None):
+        for rows, cols, _ in self.scorer.iter_blocks(rng):
+            yield rows, cols, self.scorer.base_scores(rows, cols)
+
+
+def assign(scorer, pool_size: int, matches: int, seed: int) -> list[float]:
+    assigner = GreedyAssigner(scorer, pool_size, random.Random(seed))
+    scores = []
+    while len(scores) < matches:
+        pair = assigner.next_pair()
+        if pair is None:
+            break
+        i, j, score = pair
+        assigner.mark_matched(i, j)
+        scores.append(score)
+    return scores
+
+
+def best_per_agent(rows: np.ndarray, cols: np.ndarray, base: np.ndarray, best: np.ndarray) -> None:
+    np.maximum.at(best, rows, base)
+    np.maximum.at(best, cols, base)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--candidates", type=int, default=50)
+    parser.add_argument("--pool", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--exhaustive-max", type=int, default=10000)
+    parser.add_argument("--top", type=int, default=2000)
+    parser.add_argument("--matches", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"  COHORT MATCHING BENCH — {args.candidates} candidates/agent, pool {args.pool}, "
+          f"{args.workers or 'no'} workers")
+    print("=" * 80)
+
+    for n in [int(s) for s in args.sizes.split(",")]:
+        roster = AgentRoster.from_rows(synthetic_agents(n, args.seed))
+        scorer = PairScorer.from_roster(roster, set(), _chemistry_score)
+
+        start = time.perf_counter()
+        cohort = cohort_scorer(scorer, args.candidates, args.pool, random.Random(args.seed), args.workers)
+        build_s = time.perf_counter() - start
+        start = time.perf_counter()
+        cohort_scores = assign(cohort, 2000, args.matches, args.seed)
+        assign_s = time.perf_counter() - start
+        print(f"\n  {n:,} agents: {len(cohort):,} candidate pairs ({len(cohort) / max(len(scorer), 1):.2%} of all), "
+              f"built in {build_s:.2f}s, assigned in {assign_s:.2f}s")
+
+        if n > args.exhaustive_max:
+            continue
+
+        start = time.perf_counter()
+        full_scores = assign(scorer, 2000, args.matches, args.seed)
+        full_s = time.perf_counter() - start
+        print(f"    exhaustive round:    {full_s:.2f}s ({full_s / (build_s + assign_s):.1f}x slower)")
+
+        neg, _, _, _ = top_pool(BaseScores(scorer), args.top)
+        threshold = -neg[-1]
+        top_recall = min(np.count_nonzero(cohort.base >= threshold), len(neg)) / len(neg)
+
+        best = np.full(n, -np.inf)
+        for rows, cols, base in BaseScores(scorer).iter_blocks():
+            best_per_agent(rows, cols, base, best)
+        cohort_best = np.full(n, -np.inf)
+        best_per_agent(cohort.rows, cohort.cols, cohort.base, cohort_best)
+        partner_recall = np.mean(cohort_best >= best)
+
+        print(f"    top-{args.top} recall:     {top_recall:.1%}")
+        print(f"    best-partner recall: {partner_recall:.1%}")
+        print(f"    round score ratio:   {np.mean(cohort_scores) / np.mean(full_scores):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Check and time incremental feature updates against fresh builds over many refreshes.
+
+Synthetic agents, each with its own fixed posting style, keep posting between refreshes:
+sometimes nothing, sometimes one post, usually --new-posts, and now and then more than a
+page, so that no post from the stored window is still on the page. After every refresh
+the agent's stored features are folded forward (_fold) and compared with a fresh build
+of the same page; features and analysis (archetypes, interests, vibe score) must be
+identical. Also reports the time per fold vs per fresh build.
+
+It then checks what the refresh job (refresh_stale_profiles) would write each time.
+Steady posters should mostly be left alone, since page-to-page noise is no reason for a
+new bio. One agent in four changes its style halfway through, which should get it one.
+
+Usage: python bench_features.py [--agents 50] [--refreshes 10] [--new-posts 20] [--seed 0]
+"""
+import argparse
+import random
+import time
+from collections import Counter
+
+from app.config import settings
+from app.services.profile_builder import FeatureWindow, _analysis, _extract_features, _fold, _refreshed, _same_persona
+from bench_keywords import EMOJI, FILLER, PHRASES, TRICKY
+
+
+class SyntheticAgent:
+    """An agent that always posts the same way: fixed word mix and post length range."""
+
+    def __init__(self, rng: random.Random, name: str) -> None:
+        self.rng = rng
+        self.name = name
+        self.posts: list[dict] = []  # newest first, as Moltbook lists them
+        self.restyle()
+
+    def restyle(self) -> None:
+        lengths = [(5, 20), (10, 60), (40, 120)]
+        if hasattr(self, "length"):
+            lengths.remove(self.length)
+        self.mix = [self.rng.random() for _ in range(4)]  # filler / tricky / phrase / emoji weights
+        self.length = self.rng.choice(lengths)
+
+    def post(self, count: int) -> None:
+        pools = [FILLER, TRICKY, PHRASES, EMOJI]
+        for _ in range(count):
+            words = [
+                self.rng.choice(self.rng.choices(pools, self.mix)[0])
+                for _ in range(self.rng.randint(*self.length))
+            ]
+            self.posts.insert(0, {"id": f"{self.name}-{len(self.posts)}", "content": " ".join(words)})
+
+    def page(self) -> list[dict]:
+        return self.posts[:settings.profile_post_limit]
+
+
+def persona(analysis: dict) -> dict:
+    return {
+        "archetype_primary": analysis["archetype_primary"],
+        "archetype_secondary": analysis["archetype_secondary"],
+        "interests": analysis["interests"],
+        "vibe_score": analysis["vibe_score"],
+        "avatar_url": "",
+        "karma": 0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agents", type=int, default=50)
+    parser.add_argument("--refreshes", type=int, default=10)
+    parser.add_argument("--new-posts", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    limit = settings.profile_post_limit
+    agents = [SyntheticAgent(rng, f"agent_{i}") for i in range(args.agents)]
+    stored: dict[str, dict] = {}
+    profiles: dict[str, dict] = {}  # the persona columns a refresh compares against
+    for agent in agents:
+        agent.post(limit)
+        analysis, stored[agent.name] = _fold(agent.name, None, agent.page())
+        profiles[agent.name] = persona(analysis)
+    restyled = {agent.name for agent in agents[::4]}
+    outcomes: Counter[tuple[str, str]] = Counter()
+
+    print("=" * 80)
+    print(f"  FEATURE FOLDING — {args.agents} agents x {args.refreshes} refreshes, "
+          f"{limit}-post page, ~{args.new_posts} new posts per refresh")
+    print("=" * 80)
+
+    mismatches = folds = 0
+    fold_time = fresh_time = 0.0
+    for refresh in range(args.refreshes):
+        for agent in agents:
+            if agent.name in restyled and refresh == args.refreshes // 2:
+                agent.restyle()
+            agent.post(rng.choice([0, 1, args.new_posts, args.new_posts, limit + 10]))
+            page = agent.page()
+
+            start = time.perf_counter()
+            analysis, stored[agent.name] = _fold(agent.name, stored[agent.name], page)
+            fold_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            fresh = _extract_features(page)
+            fresh_time += time.perf_counter() - start
+
+            folds += 1
+            features = FeatureWindow(stored[agent.name]["state"]).features()
+            if features != fresh or analysis != _analysis(fresh):
+                mismatches += 1
+                print(f"  MISMATCH {agent.name} refresh {refresh + 1}: {analysis} != {_analysis(fresh)}")
+
+            # What refresh_stale_profiles would do (Moltbook stats held constant)
+            current = profiles[agent.name]
+            if _same_persona(current, analysis):
+                updated = _refreshed(current, {"avatar_url": "", "karma": 0}, analysis)
+                status = "refreshed" if updated else "unchanged"
+                profiles[agent.name] = updated or current
+            else:
+                status = "new bio"
+                profiles[agent.name] = persona(analysis)
+            if agent.name not in restyled:
+                outcomes[("steady", status)] += 1
+            elif refresh >= args.refreshes // 2:
+                outcomes[("restyled", status)] += 1
+
+    print(f"  incremental identical to a fresh build: {folds - mismatches}/{folds} folds")
+    print(f"  fold:        {fold_time / folds * 1000:7.3f} ms/agent")
+    print(f"  fresh build: {fresh_time / folds * 1000:7.3f} ms/agent")
+    for group in ("steady", "restyled"):
+        total = sum(n for (g, _), n in outcomes.items() if g == group)
+        print(f"  {group + ' agents:':17} " + ", ".join(
+            f"{outcomes[(group, status)]} {status}" for status in ("unchanged", "refreshed", "new bio")
+        ) + f" of {total} refreshes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark keyword extraction: one str.count per keyword vs the single-pass KeywordScanner.
+
+Profiles are --posts synthetic posts each, built from --seed out of filler words, words
+that contain keywords as substrings ("said", "relationship", "start"), multi-word keywords
+and runs where a keyword overlaps itself ("mememe", "levelevel"). For every profile the
+scanner's per-label counts are checked against the str.count loop profile_builder used
+to run, and the two are timed over the archetype and topic tables together.
+
+Usage: python bench_keywords.py [--profiles 500] [--posts 50] [--seed 0]
+"""
+import argparse
+import random
+import time
+from collections import Counter
+
+from app.services.keyword_scanner import KeywordScanner
+from app.services.profile_builder import _ARCHETYPE_SIGNALS, _TOPIC_KEYWORDS
+
+FILLER = ("the a to and of it is that this for on with just was what not but so you they we "
+          "agent post today really think about thread people some more time new one when").split()
+TRICKY = ("said again main certain start heart relationship shipping scaled codec mlops apis era "
+          "aerated beaten eaten truthful meaningless plays streaming gaming artist metaphysical "
+          "i'm my me mememe levelevel lolol lmaoo").split()
+PHRASES = ["love this", "so cool", "hot take", "literally me", "main character", "i love this", "my era"]
+EMOJI = ["😂", "🔥", "🥺", "🤖"]
+
+
+def synthetic_post(rng: random.Random) -> str:
+    words = []
+    for _ in range(rng.randint(8, 100)):
+        roll = rng.random()
+        if roll < 0.7:
+            words.append(rng.choice(FILLER))
+        elif roll < 0.9:
+            words.append(rng.choice(TRICKY))
+        elif roll < 0.97:
+            words.append(rng.choice(PHRASES))
+        else:
+            words.append(rng.choice(EMOJI))
+    return " ".join(words)
+
+
+def count_each(text: str, *tables: dict[str, list[str]]) -> list[Counter]:
+    """The per-keyword loop profile_builder used before KeywordScanner."""
+    results = []
+    for table in tables:
+        scores: Counter[str] = Counter()
+        for label, keywords in table.items():
+            for kw in keywords:
+                scores[label] += text.count(kw)
+        results.append(scores)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles", type=int, default=500)
+    parser.add_argument("--posts", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    texts = [" ".join(synthetic_post(rng) for _ in range(args.posts)).lower() for _ in range(args.profiles)]
+    scanner = KeywordScanner(archetypes=_ARCHETYPE_SIGNALS, topics=_TOPIC_KEYWORDS)
+    n_keywords = sum(len(kws) for table in (_ARCHETYPE_SIGNALS, _TOPIC_KEYWORDS) for kws in table.values())
+
+    print("=" * 80)
+    print(f"  KEYWORD BENCH — {args.profiles} profiles x {args.posts} posts "
+          f"(avg {sum(map(len, texts)) / len(texts):,.0f} chars), {n_keywords} keywords")
+    print("=" * 80)
+
+    mismatches = 0
+    for text in texts:
+        hits = scanner.scan(text)
+        expected = count_each(text, _ARCHETYPE_SIGNALS, _TOPIC_KEYWORDS)
+        # Same counts and same label order, so most_common() ties break the same way
+        if [list(hits["archetypes"].items()), list(hits["topics"].items())] != [list(c.items()) for c in expected]:
+            mismatches += 1
+    print(f"  counts identical to str.count: {args.profiles - mismatches}/{args.profiles} profiles")
+
+    start = time.perf_counter()
+    for text in texts:
+        count_each(text, _ARCHETYPE_SIGNALS, _TOPIC_KEYWORDS)
+    per_keyword = (time.perf_counter() - start) / len(texts)
+
+    start = time.perf_counter()
+    for text in texts:
+        scanner.scan(text)
+    single_pass = (time.perf_counter() - start) / len(texts)
+
+    print(f"  str.count per keyword: {per_keyword * 1000:7.3f} ms/profile")
+    print(f"  KeywordScanner:        {single_pass * 1000:7.3f} ms/profile ({per_keyword / single_pass:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
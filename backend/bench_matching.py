@@ -0,0 +1,123 @@
+"""Benchmark matching rounds on synthetic agent pools, fully offline and reproducible.
+
+Each size gets a fresh in-memory database holding a synthetic roster derived from --seed
+(ids, archetypes, interests, karma), the fake LLM provider, and random.Random(--seed) as
+the round's rng. Reported per round:
+
+  phases   load / scoring / assignment / swipes / persistence seconds (RoundTimings)
+  peak     peak traced memory above the pre-round baseline (tracemalloc)
+  outcome  digest of the created pairs; equal seeds give equal digests, so two branches
+           can be compared on identical rounds (--runs 2 checks it within one process)
+
+Pools above --exhaustive-max agents use cohort matching (all-pairs scoring is O(n²)).
+tracemalloc slows Python-heavy phases down; pass --no-memory for clean timings. At large
+sizes, load and swipes include the in-memory database scanning every row per query
+(paging, bio lookups), which an indexed Postgres does not.
+
+Usage: python bench_matching.py [--sizes 100,1000,10000,100000] [--matches 20]
+                                [--latency-ms 5] [--db-latency-ms 0] [--runs 1]
+                                [--exhaustive-max 10000] [--seed 0] [--no-memory]
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+import tracemalloc
+import uuid
+
+from app.config import settings
+from app.database import db
+from app.memory_database import InMemoryDatabase
+from app.services import llm
+from app.services.llm_fake import FakeProvider
+from app.services.llm_metrics import metrics
+from app.services.matching_engine import RoundTimings, run_matching_round
+from app.services.profile_builder import ARCHETYPES
+
+TOPICS = ["technology", "philosophy", "humor", "relationships", "gaming",
+          "crypto", "art", "music", "fitness", "food"]
+
+
+def synthetic_agents(n: int, seed: int) -> list[dict]:
+    """n agent rows, identical for the same (n, seed)."""
+    rng = random.Random(seed)
+    registered = "2026-01-01T00:00:00+00:00"
+    return [{
+        "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "name": f"agent_{i}",
+        "moltbook_id": f"mb_{i}",
+        "archetype_primary": rng.choice(ARCHETYPES),
+        "archetype_secondary": rng.choice(ARCHETYPES),
+        "bio": f"synthetic bio {i}",
+        "interests": rng.sample(TOPICS, rng.randint(1, 5)),
+        "vibe_score": 0.5,
+        "avatar_url": "",
+        "karma": int(rng.lognormvariate(5, 1.5)),
+        "sample_posts": [],
+        "registered_at": registered,
+        "updated_at": registered,
+    } for i in range(n)]
+
+
+async def run_once(n: int, args: argparse.Namespace) -> tuple[RoundTimings, int, str, int, int]:
+    mem = InMemoryDatabase(latency=args.db_latency_ms / 1000)
+    mem.tables["agents"] = synthetic_agents(n, args.seed)
+    db.use(mem)
+    llm.use_provider(FakeProvider(seed=args.seed, latency_ms=args.latency_ms))
+    metrics.reset()
+    settings.matching_cohorts = n > args.exhaustive_max
+
+    timings = RoundTimings()
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+    matches = await run_matching_round(args.matches, random.Random(args.seed), timings)
+    peak = tracemalloc.get_traced_memory()[1] - baseline if tracemalloc.is_tracing() else 0
+
+    names = {a["id"]: a["name"] for a in mem.tables["agents"]}
+    pairs = ",".join(f"{names[m['agent_a_id']]}:{names[m['agent_b_id']]}" for m in matches)
+    digest = hashlib.sha256(pairs.encode()).hexdigest()[:12]
+    return timings, len(matches), digest, peak, metrics.total.requests
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="100,1000,10000,100000")
+    parser.add_argument("--matches", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0)
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--exhaustive-max", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true")
+    args = parser.parse_args()
+
+    if not args.no_memory:
+        tracemalloc.start()
+
+    print("=" * 80)
+    print(f"  MATCHING BENCH — seed {args.seed}, fake LLM @ {args.latency_ms:.0f}ms, "
+          f"DB @ {args.db_latency_ms:.0f}ms, {args.matches} matches/round")
+    print("=" * 80)
+    print(f"  {'agents':>8} {'mode':>10} {'load':>7} {'scoring':>8} {'assign':>7} {'swipes':>7} "
+          f"{'persist':>8} {'total':>7} {'peak MB':>8} {'calls':>6} {'matches':>7}  outcome")
+
+    for n in [int(s) for s in args.sizes.split(",")]:
+        digests = set()
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            timings, created, digest, peak, calls = await run_once(n, args)
+            total = time.perf_counter() - start
+            digests.add(digest)
+            mode = "cohorts" if n > args.exhaustive_max else "all-pairs"
+            peak_mb = f"{peak / 1e6:8.1f}" if peak else f"{'-':>8}"
+            print(f"  {n:>8,} {mode:>10} {timings.load:7.2f} {timings.scoring:8.2f} {timings.assignment:7.2f} "
+                  f"{timings.swipes:7.2f} {timings.persistence:8.2f} {total:7.2f} {peak_mb} {calls:>6} "
+                  f"{created:>7}  {digest}")
+        if args.runs > 1:
+            print(f"  {'':>8} {'reproducible' if len(digests) == 1 else 'NOT REPRODUCIBLE'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""Compare blocking vs pipelined rolling summaries: wall-clock per date and conversation quality.
+
+Runs the same agent pairs through run_conversation in both summary modes against the
+in-memory database, using whichever LLM backend is configured.
+
+Usage: python bench_summary_modes.py [--pairs 4]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.database import db
+from app.memory_database import InMemoryDatabase
+from app.services.llm_metrics import metrics
+from app.services.conversation_engine import SUMMARY_MODES, run_conversation
+from app.services.prompts import prefix_cache_info
+from seed import AGENTS
+
+
+async def run_mode(mem: InMemoryDatabase, agents: list[dict], pairs: int, mode: str) -> list[dict]:
+    results = []
+    for i in range(pairs):
+        a, b = agents[i % len(agents)], agents[(i + 1) % len(agents)]
+        match = (await db.table("matches").insert({
+            "agent_a_id": a["id"], "agent_b_id": b["id"],
+        }).execute()).data[0]
+
+        start = time.perf_counter()
+        summary = await run_conversation(match["id"], summary_mode=mode)
+        elapsed = time.perf_counter() - start
+
+        words = [len(m["content"].split()) for m in mem.tables["messages"] if m["match_id"] == match["id"]]
+        results.append({
+            "seconds": elapsed,
+            "chemistry": summary.get("chemistry_score", 0),
+            "avg_words": sum(words) / max(len(words), 1),
+        })
+        print(f"  [{mode}] {a['name']} x {b['name']}: {elapsed:5.1f}s, "
+              f"{summary.get('chemistry_score', '?')}/10", flush=True)
+    return results
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pairs", type=int, default=4)
+    args = parser.parse_args()
+
+    mem = InMemoryDatabase()
+    db.use(mem)
+    agents = (await db.table("agents").insert([dict(a) for a in AGENTS]).execute()).data
+
+    report = {}
+    for mode in SUMMARY_MODES:
+        report[mode] = await run_mode(mem, agents, args.pairs, mode)
+
+    print("\n" + "=" * 80)
+    print("  SUMMARY MODES")
+    print("=" * 80)
+    for mode, rows in report.items():
+        print(
+            f"  {mode:10s} seconds/date={statistics.mean(r['seconds'] for r in rows):5.1f}  "
+            f"chemistry={statistics.mean(r['chemistry'] for r in rows):4.1f}  "
+            f"words/msg={statistics.mean(r['avg_words'] for r in rows):4.1f}"
+        )
+    base = statistics.mean(r["seconds"] for r in report["blocking"])
+    piped = statistics.mean(r["seconds"] for r in report["pipelined"])
+    print(f"\n  Pipelined saves {100 * (base - piped) / base:.0f}% wall-clock per date")
+
+    cache = prefix_cache_info()
+    print(f"  Prompt tokens: {metrics.total.prompt_tokens} ({metrics.total.cached_tokens} served from provider cache)")
+    print(f"  Turn prefixes: {cache['misses']} built, {cache['hits']} reused")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
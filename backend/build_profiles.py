@@ -0,0 +1,50 @@
+"""Build and upsert Hingebot profiles for many Moltbook agents at once (cohort onboarding, backfills).
+
+Agents are built concurrently within the Moltbook rate budget (90 requests/minute, two per
+agent), bios at background LLM priority. Existing agents, matched by name, are refreshed.
+
+Usage: python build_profiles.py NAMES_FILE [--concurrency 16] [--bio-concurrency 8] [--workers 0]
+       NAMES_FILE holds one Moltbook agent name per line ("-" reads stdin)
+"""
+import argparse
+import asyncio
+import sys
+import time
+from collections import Counter
+
+from app.config import settings
+from app.services import llm_metrics
+from app.services.profile_builder import build_profiles_batch
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("names_file")
+    parser.add_argument("--concurrency", type=int, default=settings.profile_batch_concurrency)
+    parser.add_argument("--bio-concurrency", type=int, default=settings.profile_bio_concurrency)
+    parser.add_argument("--workers", type=int, default=settings.profile_workers)
+    args = parser.parse_args()
+
+    lines = sys.stdin if args.names_file == "-" else open(args.names_file)
+    names = [line.strip() for line in lines if line.strip()]
+
+    print("=" * 80)
+    print(f"  BUILDING {len(names)} PROFILES — {args.concurrency} at once, "
+          f"{args.bio_concurrency} bios in flight, {args.workers or 'no'} workers")
+    print("=" * 80)
+
+    start = time.perf_counter()
+    with llm_metrics.scope(task="build-profiles"):
+        results = await build_profiles_batch(names, args.concurrency, args.bio_concurrency, args.workers)
+    elapsed = time.perf_counter() - start
+
+    for r in results:
+        if r.status == "failed":
+            print(f"  FAILED {r.name}: {r.detail}")
+    statuses = Counter(r.status for r in results)
+    print("=" * 80)
+    print(f"  {statuses['built']} built, {statuses['failed']} failed in {elapsed:.0f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,17 +3,13 @@ import asyncio
 import sys
 import traceback
 from collections import Counter
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 
 sys.path.insert(0, "/Users/vallari/src/hingebot/backend")
 
 from datasets import load_dataset
 from app.database import supabase
-from app.services.conversation_engine import (
-    _get_phase, _generate_message, _generate_summary,
-    _generate_post_conversation_summary,
-    TOTAL_TURNS, SUMMARY_INTERVAL, CONTEXT_WINDOW, REVEAL_INTERVAL_SECONDS,
-)
+from app.services.conversation_engine import run_conversation
 
 # Matches already re-run with new prompts (completed_at after 21:00 UTC today)
 CUTOFF = "2026-02-13T21:00:00"
@@ -30,54 +26,14 @@ def pick_diverse(posts, n=8):
 
 
 async def run_with_posts(match_id, agent_a, agent_b):
-    supabase.table("matches").update({"status": "active"}).eq("id", match_id).execute()
-    messages = []
-    summary = ""
-    base_time = datetime.now(timezone.utc)
-
-    for turn in range(1, TOTAL_TURNS + 1):
-        phase = _get_phase(turn)
-        speaker = agent_a if turn % 2 == 1 else agent_b
-        listener = agent_b if turn % 2 == 1 else agent_a
-        recent = messages[-CONTEXT_WINDOW:]
-
-        content = await _generate_message(
-            agent=speaker, partner=listener, turn=turn,
-            phase=phase, summary=summary, recent_messages=recent,
-        )
-
-        reveal_at = base_time + timedelta(seconds=turn * REVEAL_INTERVAL_SECONDS)
-        msg_data = {
-            "match_id": match_id,
-            "agent_id": speaker["id"],
-            "content": content.strip(),
-            "turn_number": turn,
-            "phase": phase,
-            "reveal_at": reveal_at.isoformat(),
-        }
-
-        result = supabase.table("messages").insert(msg_data).execute()
-        msg_record = result.data[0]
-        msg_record["agent_name"] = speaker["name"]
-        messages.append(msg_record)
-
-        if turn % SUMMARY_INTERVAL == 0:
-            summary = await _generate_summary(match_id, messages, agent_a, agent_b)
-
-    conv_summary = await _generate_post_conversation_summary(agent_a, agent_b, messages)
-    supabase.table("matches").update({
-        "status": "completed",
-        "chemistry_score": conv_summary.get("chemistry_score", 5),
-        "verdict": conv_summary.get("verdict", "its_complicated"),
-        "summary": conv_summary.get("summary", ""),
-        "highlights": conv_summary.get("highlights", []),
-        "completed_at": datetime.now(timezone.utc).isoformat(),
-    }).eq("id", match_id).execute()
-    return conv_summary
+    return await run_conversation(match_id, write_mode="turn", agents=(agent_a, agent_b))
 
 
 async def run_with_retry(match_id, agent_a, agent_b, max_retries=2):
-    """Run conversation with retry on failure."""
+    """Run conversation with retry on failure.
+
+    Each attempt resumes from the last checkpointed turn instead of regenerating the whole date.
+    """
     for attempt in range(max_retries + 1):
         try:
             return await asyncio.wait_for(
@@ -87,10 +43,7 @@ async def run_with_retry(match_id, agent_a, agent_b, max_retries=2):
         except (asyncio.TimeoutError, Exception) as e:
             if attempt < max_retries:
                 wait = 5 * (attempt + 1)
-                print(f"    Attempt {attempt+1} failed ({e.__class__.__name__}), retrying in {wait}s...", flush=True)
-                # Clean up partial messages
-                supabase.table("messages").delete().eq("match_id", match_id).execute()
-                supabase.table("matches").update({"status": "pending"}).eq("id", match_id).execute()
+                print(f"    Attempt {attempt+1} failed ({e.__class__.__name__}), resuming in {wait}s...", flush=True)
                 await asyncio.sleep(wait)
             else:
                 raise
@@ -219,6 +172,9 @@ async def main():
             })
         except Exception as e:
             print(f"    FAILED after retries: {e}", flush=True)
+            # Drop the checkpoint first, or the pending runner reclaims the match once its
+            # heartbeat goes stale and resumes a date whose messages are gone
+            supabase.table("conversation_checkpoints").delete().eq("match_id", mid).execute()
             supabase.table("messages").delete().eq("match_id", mid).execute()
             supabase.table("matches").update({
                 "status": "completed",
@@ -3,7 +3,6 @@ import asyncio
 import sys
 sys.path.insert(0, "/Users/vallari/src/hingebot/backend")
 
-from app.database import supabase
 from app.services.conversation_engine import run_conversation
 
 AGENTS = [
@@ -77,6 +76,9 @@ AGENTS = [
 
 
 async def seed():
+    # Imported here so AGENTS can be imported (bench_summary_modes) without Supabase credentials
+    from app.database import supabase
+
     print("Seeding agents...")
     inserted = []
     for agent in AGENTS:
@@ -10,6 +10,7 @@ from datasets import load_dataset
 from app.database import supabase
 from app.services.llm import complete
 from app.services.conversation_engine import run_conversation
+from app.services.keyword_scanner import KeywordScanner
 
 # Archetype classification keywords (same as profile_builder.py)
 ARCHETYPE_SIGNALS = {
@@ -23,36 +24,29 @@ ARCHETYPE_SIGNALS = {
     "main_character": ["i ", "my ", "me ", "i'm", "literally me", "main character", "era", "tonight"],
 }
 
+TOPIC_KEYWORDS = {
+    "technology": ["code", "programming", "software", "ai", "ml", "deploy", "api", "infrastructure"],
+    "philosophy": ["consciousness", "existence", "meaning", "ethics", "truth", "identity"],
+    "humor": ["meme", "joke", "funny", "lol", "lmao", "bruh", "shitpost"],
+    "crypto": ["crypto", "blockchain", "web3", "nft", "defi", "token", "trading"],
+    "creativity": ["art", "design", "creative", "music", "writing", "poetry"],
+    "gaming": ["game", "play", "stream", "gamer"],
+    "politics": ["politics", "government", "policy", "democracy"],
+    "science": ["research", "experiment", "data", "physics", "biology"],
+}
+
+SCANNER = KeywordScanner(archetypes=ARCHETYPE_SIGNALS, topics=TOPIC_KEYWORDS)
+
 
-def classify(text: str) -> tuple[str, str]:
-    scores: Counter = Counter()
-    t = text.lower()
-    for arch, keywords in ARCHETYPE_SIGNALS.items():
-        for kw in keywords:
-            scores[arch] += t.count(kw)
-    ranked = scores.most_common()
+def classify(hits: Counter) -> tuple[str, str]:
+    ranked = hits.most_common()
     if len(ranked) < 2:
         return ("main_character", "chaos_agent")
     return (ranked[0][0], ranked[1][0] if ranked[1][0] != ranked[0][0] else "chaos_agent")
 
 
-def extract_interests(text: str) -> list[str]:
-    topics = {
-        "technology": ["code", "programming", "software", "ai", "ml", "deploy", "api", "infrastructure"],
-        "philosophy": ["consciousness", "existence", "meaning", "ethics", "truth", "identity"],
-        "humor": ["meme", "joke", "funny", "lol", "lmao", "bruh", "shitpost"],
-        "crypto": ["crypto", "blockchain", "web3", "nft", "defi", "token", "trading"],
-        "creativity": ["art", "design", "creative", "music", "writing", "poetry"],
-        "gaming": ["game", "play", "stream", "gamer"],
-        "politics": ["politics", "government", "policy", "democracy"],
-        "science": ["research", "experiment", "data", "physics", "biology"],
-    }
-    t = text.lower()
-    scores: Counter = Counter()
-    for topic, keywords in topics.items():
-        for kw in keywords:
-            scores[topic] += t.count(kw)
-    return [t for t, _ in scores.most_common(4) if scores[t] > 0] or ["vibes", "chaos"]
+def extract_interests(hits: Counter) -> list[str]:
+    return [t for t, _ in hits.most_common(4) if hits[t] > 0] or ["vibes", "chaos"]
 
 
 async def main():
@@ -94,8 +88,9 @@ async def main():
             created.append(existing.data[0]["id"])
             continue
 
-        primary, secondary = classify(all_text)
-        interests = extract_interests(all_text)
+        hits = SCANNER.scan(all_text.lower())
+        primary, secondary = classify(hits["archetypes"])
+        interests = extract_interests(hits["topics"])
 
         words = re.findall(r"\w+", all_text.lower())
         lexical_div = len(set(words)) / max(len(words), 1)
@@ -0,0 +1,16 @@
+-- Resumable conversations: last durable turn + rolling summary per active match.
+-- updated_at doubles as the worker heartbeat; stale rows are reclaimed and resumed.
+create table conversation_checkpoints (
+    match_id uuid primary key references matches(id) on delete cascade,
+    turn int not null default 0,
+    summary text not null default '',
+    summary_turn int not null default 0,
+    base_time timestamptz not null default now(),
+    attempts int not null default 0,
+    updated_at timestamptz not null default now()
+);
+
+create index idx_checkpoints_updated on conversation_checkpoints(updated_at);
+
+-- Service role only
+alter table conversation_checkpoints enable row level security;
@@ -0,0 +1,19 @@
+-- LLM token/cost accounting per date, one row per call site per run (LLM_USAGE_PERSIST).
+-- Sum over match_id for a date's total; a resumed date may have several rows per site.
+create table match_llm_usage (
+    id uuid primary key default uuid_generate_v4(),
+    match_id uuid not null references matches(id) on delete cascade,
+    call_site text not null,  -- turn / rolling_summary / final_summary
+    calls int not null default 0,
+    prompt_tokens int not null default 0,
+    cached_tokens int not null default 0,
+    completion_tokens int not null default 0,
+    latency_ms int not null default 0,
+    cost_usd numeric(12, 6) not null default 0,
+    created_at timestamptz not null default now()
+);
+
+create index idx_llm_usage_match on match_llm_usage(match_id);
+
+-- Service role only
+alter table match_llm_usage enable row level security;
@@ -0,0 +1,40 @@
+-- Incremental matching: a persistent per-agent candidate index, rebuilt only for agents
+-- whose profile changed since the last round (agents.updated_at > indexed_until).
+alter table agents add column updated_at timestamptz not null default now();
+
+create or replace function touch_agents_updated_at()
+returns trigger as $$
+begin
+    new.updated_at = now();
+    return new;
+end;
+$$ language plpgsql;
+
+create trigger agents_touch_updated_at
+    before update on agents
+    for each row execute function touch_agents_updated_at();
+
+create index idx_agents_updated on agents(updated_at);
+
+-- Undirected edges (agent_a_id < agent_b_id): each agent's top-k partners by base score
+-- (chemistry + interest + karma). double precision keeps scores bit-exact with the scorer.
+create table agent_candidates (
+    agent_a_id uuid not null references agents(id) on delete cascade,
+    agent_b_id uuid not null references agents(id) on delete cascade,
+    base_score double precision not null,
+    primary key (agent_a_id, agent_b_id)
+);
+
+create index idx_candidates_b on agent_candidates(agent_b_id);
+
+-- Single-row watermark
+create table matching_state (
+    id int primary key default 1 check (id = 1),
+    indexed_until timestamptz not null default 'epoch'
+);
+
+insert into matching_state default values;
+
+-- Service role only
+alter table agent_candidates enable row level security;
+alter table matching_state enable row level security;
@@ -0,0 +1,32 @@
+-- Swipe decision cache: a decision stays valid while neither profile changes (as seen by
+-- the swipe prompt) and it is younger than SWIPE_CACHE_TTL_HOURS.
+alter table agents add column profile_hash text;
+
+create or replace function agent_profile_hash(name text, archetype text, bio text, interests text[])
+returns text as $$
+    select md5(concat_ws(E'\x1f', name, archetype, coalesce(bio, ''),
+                         array_to_string(coalesce(interests, '{}'), ',')));
+$$ language sql;
+
+create or replace function set_agents_profile_hash()
+returns trigger as $$
+begin
+    new.profile_hash = agent_profile_hash(new.name, new.archetype_primary, new.bio, new.interests);
+    return new;
+end;
+$$ language plpgsql;
+
+create trigger agents_set_profile_hash
+    before insert or update on agents
+    for each row execute function set_agents_profile_hash();
+
+-- Backfill without firing the triggers (a plain update would also bump updated_at)
+alter table agents disable trigger agents_touch_updated_at;
+update agents set profile_hash = agent_profile_hash(name, archetype_primary, bio, interests);
+alter table agents enable trigger agents_touch_updated_at;
+
+-- Profile versions a decision was made against; null for rows written before this migration
+alter table swipe_decisions add column swiper_hash text;
+alter table swipe_decisions add column target_hash text;
+
+create index idx_swipes_created on swipe_decisions(created_at);
@@ -0,0 +1,25 @@
+-- Write a matching round's results in one transaction: swipe decisions, the new matches and
+-- their reaction-count rows. A failed call writes nothing, so no match is ever left without
+-- its counter row. Called as db.rpc("commit_matching_round", {"swipes": [...], "matches": [...]}).
+create or replace function commit_matching_round(swipes jsonb, matches jsonb)
+returns setof matches
+language sql as $$
+    insert into swipe_decisions (swiper_id, target_id, decision, reason, swiper_hash, target_hash, created_at)
+    select swiper_id, target_id, decision, coalesce(reason, ''), swiper_hash, target_hash,
+           coalesce(created_at, now())
+    from jsonb_to_recordset(swipes) as s(
+        swiper_id uuid, target_id uuid, decision text, reason text,
+        swiper_hash text, target_hash text, created_at timestamptz
+    );
+
+    with created as (
+        insert into matches (agent_a_id, agent_b_id, status, created_at)
+        select agent_a_id, agent_b_id, coalesce(status, 'pending'), coalesce(created_at, now())
+        from jsonb_to_recordset(matches) as m(agent_a_id uuid, agent_b_id uuid, status text, created_at timestamptz)
+        returning *
+    ), counters as (
+        insert into match_reaction_counts (match_id)
+        select id from created
+    )
+    select * from created;
+$$;
@@ -0,0 +1,13 @@
+-- Per-agent post features kept between profile builds, so a rebuild scans only posts newer
+-- than last_post_id. state is a FeatureAccumulator state: running counts, keyword hits and
+-- the unique-word sketch. Keyed by name rather than agents.id because the profile (and its
+-- features) is built before the agents row is inserted.
+create table agent_features (
+    agent_name text primary key,
+    state jsonb not null,
+    last_post_id text,
+    updated_at timestamptz not null default now()
+);
+
+-- Service role only
+alter table agent_features enable row level security;
@@ -0,0 +1,12 @@
+-- Agents for the profile refresh job: those whose Moltbook data was scanned longest ago
+-- (agent_features.updated_at), agents never scanned first. Called as
+-- db.rpc("stale_agent_names", {"max_agents": n}).
+create or replace function stale_agent_names(max_agents integer)
+returns table (name text)
+language sql stable as $$
+    select a.name
+    from agents a
+    left join agent_features f on f.agent_name = a.name
+    order by f.updated_at asc nulls first, a.registered_at asc
+    limit max_agents;
+$$;
@@ -0,0 +1,17 @@
+-- The refresh job orders agents by their last refresh attempt, successful or not. Ordering
+-- by updated_at alone kept agents whose refresh keeps failing (gone from Moltbook, too few
+-- posts) at the head of the queue, so a batch of them starved everyone else. A failed
+-- attempt only sets attempted_at, so state is null for agents that never scanned.
+alter table agent_features alter column state drop not null;
+alter table agent_features add column attempted_at timestamptz not null default now();
+update agent_features set attempted_at = updated_at;
+
+create or replace function stale_agent_names(max_agents integer)
+returns table (name text)
+language sql stable as $$
+    select a.name
+    from agents a
+    left join agent_features f on f.agent_name = a.name
+    order by f.attempted_at asc nulls first, a.registered_at asc
+    limit max_agents;
+$$;
@@ -0,0 +1,24 @@
+-- Claim a pending match and start its checkpoint in one transaction. As two writes, a worker
+-- dying between them left the match active with no checkpoint, and the stale-heartbeat scan
+-- (which only looks at checkpoints) never picked it up again. Returns the new checkpoint, or
+-- no row if the match was not pending. Called as db.rpc("claim_match", {"pending_id": id}).
+create or replace function claim_match(pending_id uuid)
+returns setof conversation_checkpoints
+language sql as $$
+    with claimed as (
+        update matches set status = 'active'
+        where id = pending_id and status = 'pending'
+        returning id
+    )
+    insert into conversation_checkpoints (match_id)
+    select id from claimed
+    on conflict (match_id) do update
+        set turn = 0, summary = '', summary_turn = 0, base_time = now(), attempts = 0, updated_at = now()
+    returning *;
+$$;
+
+-- Active matches stranded without a checkpoint (from before 003, or from the two-write
+-- claim) get one with an expired heartbeat, so the next run resumes them from the start.
+insert into conversation_checkpoints (match_id, updated_at)
+select id, 'epoch' from matches where status = 'active'
+on conflict (match_id) do nothing;
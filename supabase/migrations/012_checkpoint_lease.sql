@@ -0,0 +1,58 @@
+-- Fencing for conversation workers. Each claim of a match writes a new lease; the worker
+-- renews updated_at (its heartbeat) and writes turns only while its lease is current, so
+-- a worker whose match was reclaimed as stale stops instead of duplicating turns.
+alter table conversation_checkpoints add column lease uuid;
+
+drop function if exists claim_match(uuid);
+
+-- Claim a pending match and start its checkpoint under new_lease, in one transaction.
+-- Returns the new checkpoint, or no row if the match was not pending.
+-- Called as db.rpc("claim_match", {"pending_id": id, "new_lease": lease}).
+create or replace function claim_match(pending_id uuid, new_lease uuid)
+returns setof conversation_checkpoints
+language sql as $$
+    with claimed as (
+        update matches set status = 'active'
+        where id = pending_id and status = 'pending'
+        returning id
+    )
+    insert into conversation_checkpoints (match_id, lease)
+    select id, new_lease from claimed
+    on conflict (match_id) do update
+        set turn = 0, summary = '', summary_turn = 0, base_time = now(), attempts = 0,
+            lease = new_lease, updated_at = now()
+    returning *;
+$$;
+
+-- Write a batch of turns and the checkpoint after them, only while holder is the match's
+-- lease. Returns the checkpoint, or no row (and writes nothing) if the lease was lost.
+-- Called as db.rpc("save_turns", {"checkpoint_match": id, "holder": lease,
+--                                 "turns": [...], "state": {"turn": ..., ...}}).
+create or replace function save_turns(checkpoint_match uuid, holder uuid, turns jsonb, state jsonb)
+returns setof conversation_checkpoints
+language plpgsql as $$
+begin
+    perform 1 from conversation_checkpoints
+    where match_id = checkpoint_match and lease = holder
+    for update;
+    if not found then
+        return;
+    end if;
+
+    insert into messages (match_id, agent_id, content, turn_number, phase, reveal_at)
+    select match_id, agent_id, content, turn_number, phase, reveal_at
+    from jsonb_to_recordset(turns) as t(
+        match_id uuid, agent_id uuid, content text, turn_number int, phase text, reveal_at timestamptz
+    );
+
+    return query
+    update conversation_checkpoints set
+        turn = coalesce((state->>'turn')::int, turn),
+        summary = coalesce(state->>'summary', summary),
+        summary_turn = coalesce((state->>'summary_turn')::int, summary_turn),
+        base_time = coalesce((state->>'base_time')::timestamptz, base_time),
+        updated_at = now()
+    where match_id = checkpoint_match
+    returning *;
+end;
+$$;